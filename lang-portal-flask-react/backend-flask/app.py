@@ -2,12 +2,19 @@ from flask import Flask, g
 from flask_cors import CORS
 
 from lib.db import Db
+from lib.snapshot import ReadSnapshot
+from lib.pubsub import PubSub
+from lib.coalesce import SingleFlight
+import lib.metrics
+import lib.migrations
+import lib.maintenance
 
 import routes.words
 import routes.groups
 import routes.study_sessions
 import routes.dashboard
 import routes.study_activities
+import routes.metrics
 
 def get_allowed_origins(app):
     try:
@@ -33,13 +40,42 @@ def create_app(test_config=None):
     
     if test_config is None:
         app.config.from_mapping(
-            DATABASE='words.db'
+            DATABASE='words.db',
+            MAINTENANCE_SCHEDULER=False,
+            MAINTENANCE_WINDOW=(2, 5),
+            ANALYTICS_SNAPSHOT=False,
+            SNAPSHOT_MAX_AGE=30.0,
+            COALESCE_TTL=2.0
         )
     else:
         app.config.update(test_config)
+
+    # Apply pending migrations, costs a single query when the schema is current.
+    # Skipped until `invoke init-db` has created the tables (it migrates too).
+    if app.config.get('MIGRATE_ON_STARTUP', True) and lib.migrations.has_schema(app.config['DATABASE']):
+        try:
+            for name in lib.migrations.migrate(app.config['DATABASE']):
+                print(f"Applied migration: {name}")
+        except lib.migrations.MigrationError as e:
+            print(f"Error running migrations: {str(e)}")
     
     # Initialize database first since we need it for CORS configuration
-    app.db = Db(database=app.config['DATABASE'])
+    app.db = Db(
+        database=app.config['DATABASE'],
+        journal_mode=app.config.get('JOURNAL_MODE'),
+        busy_timeout=app.config.get('BUSY_TIMEOUT', 5.0)
+    )
+    
+    # Dashboard/analytics queries can read from a periodically refreshed
+    # copy of the database instead of the one taking review writes
+    if app.config.get('ANALYTICS_SNAPSHOT'):
+        app.analytics_db = ReadSnapshot(
+            app.config['DATABASE'],
+            max_age=app.config.get('SNAPSHOT_MAX_AGE', 30.0)
+        )
+        app.analytics_db.start()
+    else:
+        app.analytics_db = app.db
     
     # Get allowed origins from study_activities table
     allowed_origins = get_allowed_origins(app)
@@ -61,6 +97,28 @@ def create_app(test_config=None):
     @app.teardown_appcontext
     def close_db(exception):
         app.db.close()
+        if app.analytics_db is not app.db:
+            app.analytics_db.close()
+
+    # Identical concurrent reads of expensive routes share one computation
+    app.singleflight = SingleFlight(ttl=app.config.get('COALESCE_TTL', 2.0))
+
+    # Live events (e.g. /study_sessions/<id>/events) for clients in this process
+    app.pubsub = PubSub()
+
+    # Run ANALYZE/optimize, incremental vacuum and WAL checkpoints off-peak.
+    # `python app.py` runs with the reloader but only sets app.debug in app.run(),
+    # after this; `flask run --debug` sets it from FLASK_DEBUG.
+    debug = app.debug or __name__ == '__main__'
+    if app.config.get('MAINTENANCE_SCHEDULER') and lib.maintenance.in_serving_process(debug):
+        app.maintenance = lib.maintenance.MaintenanceScheduler(
+            app.config['DATABASE'],
+            window=app.config.get('MAINTENANCE_WINDOW', (2, 5))
+        )
+        app.maintenance.start()
+
+    # Record request latency, DB time and payload sizes for /metrics
+    lib.metrics.instrument(app)
 
     # load routes -----------
     routes.words.load(app)
@@ -68,6 +126,7 @@ def create_app(test_config=None):
     routes.study_sessions.load(app)
     routes.dashboard.load(app)
     routes.study_activities.load(app)
+    routes.metrics.load(app)
     
     return app
 
@@ -0,0 +1,106 @@
+import functools
+import threading
+import time
+from flask import Response, g, request
+
+from lib.snapshot import SNAPSHOT_HEADERS
+
+class _Call:
+  def __init__(self):
+    self.event = threading.Event()
+    self.value = None
+    self.error = None
+
+class SingleFlight:
+  """
+  Concurrent calls with the same key share one in-flight computation.
+
+  Results are kept for ttl seconds afterwards, so a burst of identical
+  requests runs the work once. Put anything that should invalidate a result
+  (e.g. a write version) in the key.
+  """
+
+  def __init__(self, ttl=2.0):
+    self.ttl = ttl
+    self.lock = threading.Lock()
+    self.calls = {}  # key -> _Call in flight
+    self.results = {}  # key -> (expires_at, value)
+    self.hits = 0
+    self.shared = 0
+    self.misses = 0
+
+  def _prune(self, now):
+    for key in [key for key, (expires_at, _) in self.results.items() if expires_at <= now]:
+      del self.results[key]
+
+  def do(self, key, fn, cacheable=lambda value: True):
+    with self.lock:
+      cached = self.results.get(key)
+      if cached and cached[0] > time.monotonic():
+        self.hits += 1
+        return cached[1]
+      call = self.calls.get(key)
+      leader = call is None
+      if leader:
+        call = self.calls[key] = _Call()
+        self.misses += 1
+      else:
+        self.shared += 1
+
+    if not leader:
+      call.event.wait()
+      if call.error is not None:
+        raise call.error
+      return call.value
+
+    try:
+      call.value = fn()
+      return call.value
+    except Exception as e:
+      call.error = e
+      raise
+    finally:
+      with self.lock:
+        del self.calls[key]
+        if call.error is None and self.ttl > 0 and cacheable(call.value):
+          now = time.monotonic()
+          self._prune(now)
+          self.results[key] = (now + self.ttl, call.value)
+      call.event.set()
+
+def request_key(version):
+  # Same route, same query args in any order, same representation
+  args = tuple(sorted(request.args.items(multi=True)))
+  return (
+    request.endpoint,
+    tuple(sorted(request.view_args.items())) if request.view_args else (),
+    args,
+    request.headers.get('Accept', ''),
+    request.headers.get('Accept-Encoding', ''),
+    version
+  )
+
+def coalesced(app):
+  """Share the response of identical concurrent GET requests (see SingleFlight)"""
+  def decorator(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+      def compute():
+        response = app.make_response(view(*args, **kwargs))
+        # Responses can't be shared between requests, their parts can. The
+        # snapshot age is left out since it grows while the result is reused.
+        skipped = {name.lower() for name in SNAPSHOT_HEADERS}
+        headers = [(name, value) for name, value in response.headers.items() if name.lower() not in skipped]
+        return response.get_data(), response.status_code, headers, g.get('snapshot_refreshed_at')
+
+      body, status, headers, refreshed_at = app.singleflight.do(
+        request_key(app.db.write_version),
+        compute,
+        cacheable=lambda result: result[1] == 200
+      )
+      response = Response(body, status=status, headers=headers)
+      if refreshed_at is not None:
+        app.analytics_db.annotate(response, refreshed_at)
+      return response
+    return wrapper
+  return decorator
@@ -1,25 +1,100 @@
 import sqlite3
 import json
+import threading
+import time
 from flask import g
 
+from lib import metrics
+
+# Number of times a statement is retried when SQLite reports the database
+# as busy/locked, and the base delay (seconds) between attempts
+LOCK_RETRIES = 3
+LOCK_RETRY_DELAY = 0.05
+
+def is_locked_error(error):
+  message = str(error)
+  return 'database is locked' in message or 'database is busy' in message
+
+def _timed(fn, *args, retry=True):
+  # Run a SQLite call, recording its duration and, if retry is set,
+  # retrying on lock contention
+  attempt = 0
+  while True:
+    start = time.perf_counter()
+    try:
+      return fn(*args)
+    except sqlite3.OperationalError as e:
+      if not is_locked_error(e):
+        raise
+      if not retry or attempt >= LOCK_RETRIES:
+        metrics.SQLITE_BUSY_ERRORS.inc()
+        raise
+      attempt += 1
+      metrics.SQLITE_LOCK_RETRIES.inc()
+      time.sleep(LOCK_RETRY_DELAY * attempt)
+    finally:
+      metrics.add_db_time(time.perf_counter() - start)
+
+# Schema and seed data, in the order they are loaded
+SETUP_TABLES = [
+  'setup/create_table_words.sql',
+  'setup/create_table_word_reviews.sql',
+  'setup/create_table_word_review_items.sql',
+  'setup/create_table_groups.sql',
+  'setup/create_table_word_groups.sql',
+  'setup/create_table_study_activities.sql',
+  'setup/create_table_study_sessions.sql'
+]
+
+SEED_WORD_GROUPS = [
+  ('Core Verbs', 'seed/data_verbs.json'),
+  ('Core Adjectives', 'seed/data_adjectives.json')
+]
+
+SEED_STUDY_ACTIVITIES = 'seed/study_activities.json'
+
+class TimedCursor(sqlite3.Cursor):
+  def execute(self, *args):
+    return _timed(super().execute, *args)
+
+  def executemany(self, *args):
+    return _timed(super().executemany, *args)
+
+  # Only timed: a fetch that fails part way can't be retried without
+  # skipping or repeating rows, so lock retries stop at execute
+  def fetchone(self):
+    return _timed(super().fetchone, retry=False)
+
+  def fetchall(self):
+    return _timed(super().fetchall, retry=False)
+
 class Db:
-  def __init__(self, database='words.db'):
+  def __init__(self, database='words.db', journal_mode=None, busy_timeout=5.0):
     self.database = database
     self.connection = None
+    self.journal_mode = journal_mode  # e.g. 'wal', None keeps the file's current mode
+    self.busy_timeout = busy_timeout  # seconds SQLite waits on a lock before failing
+    # Incremented on every commit, lets cached reads notice they are stale
+    self.write_version = 0
+    self.write_lock = threading.Lock()
 
   def get(self):
     if 'db' not in g:
-      g.db = sqlite3.connect(self.database)
+      g.db = sqlite3.connect(self.database, timeout=self.busy_timeout)
       g.db.row_factory = sqlite3.Row  # Return rows as dictionaries
+      if self.journal_mode:
+        g.db.execute(f'PRAGMA journal_mode={self.journal_mode}')
     return g.db
 
   def commit(self):
-    self.get().commit()
+    _timed(self.get().commit)
+    with self.write_lock:
+      self.write_version += 1
 
   def cursor(self):
     # Ensure the connection is valid before getting a cursor
     connection = self.get()
-    return connection.cursor()
+    return connection.cursor(factory=TimedCursor)
 
   def close(self):
     db = g.pop('db', None)
@@ -38,26 +113,9 @@ class Db:
 
   def setup_tables(self,cursor):
     # Create the necessary tables
-    cursor.execute(self.sql('setup/create_table_words.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_word_reviews.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_word_review_items.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_groups.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_word_groups.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_study_activities.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_study_sessions.sql'))
-    self.get().commit()
+    for filepath in SETUP_TABLES:
+      cursor.execute(self.sql(filepath))
+      self.get().commit()
 
   def import_study_activities_json(self,cursor,data_json_path):
     study_actvities = self.load_json(data_json_path)
@@ -114,20 +172,16 @@ class Db:
     with app.app_context():
       cursor = self.cursor()
       self.setup_tables(cursor)
-      self.import_word_json(
-        cursor=cursor,
-        group_name='Core Verbs',
-        data_json_path='seed/data_verbs.json'
-      )
-      self.import_word_json(
-        cursor=cursor,
-        group_name='Core Adjectives',
-        data_json_path='seed/data_adjectives.json'
-      )
+      for group_name, data_json_path in SEED_WORD_GROUPS:
+        self.import_word_json(
+          cursor=cursor,
+          group_name=group_name,
+          data_json_path=data_json_path
+        )
 
       self.import_study_activities_json(
         cursor=cursor,
-        data_json_path='seed/study_activities.json'
+        data_json_path=SEED_STUDY_ACTIVITIES
       )
 
 # Create an instance of the Db class
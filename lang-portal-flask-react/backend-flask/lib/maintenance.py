@@ -0,0 +1,163 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+# PRAGMA auto_vacuum values
+AUTO_VACUUM_NONE = 0
+AUTO_VACUUM_INCREMENTAL = 2
+
+def _size(database):
+  size = 0
+  for path in (database, database + '-wal'):
+    if os.path.exists(path):
+      size += os.path.getsize(path)
+  return size
+
+def _pragma(conn, name):
+  return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+def _step(conn, steps, name, *statements):
+  start = time.perf_counter()
+  result = None
+  for statement in statements:
+    result = conn.execute(statement).fetchall()
+  steps.append({'step': name, 'duration_ms': round((time.perf_counter() - start) * 1000, 2)})
+  return result
+
+def run_maintenance(database, trigger='task', vacuum_pages=0, convert=False, busy_timeout=30.0):
+  """
+  Refresh planner statistics, reclaim free pages and checkpoint the WAL.
+
+  vacuum_pages limits how many free pages an incremental vacuum releases
+  (0 releases all of them). Databases created before auto_vacuum was enabled
+  can only switch with a full VACUUM, which rewrites the whole file; that only
+  happens when convert is set.
+  """
+  conn = sqlite3.connect(database, isolation_level=None, timeout=busy_timeout)
+  try:
+    started_at = datetime.now()
+    start = time.perf_counter()
+    bytes_before = _size(database)
+    freelist_before = _pragma(conn, 'freelist_count')
+    steps = []
+
+    # Statistics for the query planner. ANALYZE once, then let
+    # PRAGMA optimize decide which tables need it again.
+    has_stats = conn.execute(
+      "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    if has_stats:
+      _step(conn, steps, 'optimize', 'PRAGMA optimize')
+    else:
+      _step(conn, steps, 'analyze', 'ANALYZE')
+
+    auto_vacuum = _pragma(conn, 'auto_vacuum')
+    if auto_vacuum == AUTO_VACUUM_INCREMENTAL:
+      # execute() only steps a statement without result columns once, which
+      # frees a single page; executescript() runs it to completion
+      start_vacuum = time.perf_counter()
+      conn.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)});')
+      steps.append({'step': 'incremental_vacuum', 'duration_ms': round((time.perf_counter() - start_vacuum) * 1000, 2)})
+    elif auto_vacuum == AUTO_VACUUM_NONE and convert:
+      _step(conn, steps, 'vacuum', 'PRAGMA auto_vacuum = INCREMENTAL', 'VACUUM')
+
+    if _pragma(conn, 'journal_mode') == 'wal':
+      busy, log_frames, checkpointed = _step(conn, steps, 'wal_checkpoint', 'PRAGMA wal_checkpoint(TRUNCATE)')[0]
+      steps[-1].update({'busy': busy, 'log_frames': log_frames, 'checkpointed_frames': checkpointed})
+
+    run = {
+      'started_at': started_at.strftime('%Y-%m-%d %H:%M:%S'),
+      'triggered_by': trigger,
+      'steps': steps,
+      'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+      'bytes_before': bytes_before,
+      'bytes_after': _size(database),
+      'freelist_pages_before': freelist_before,
+      'freelist_pages_after': _pragma(conn, 'freelist_count')
+    }
+    run['bytes_reclaimed'] = max(0, run['bytes_before'] - run['bytes_after'])
+
+    try:
+      conn.execute('''
+        INSERT INTO maintenance_runs (
+          started_at, triggered_by, steps, duration_ms, bytes_before, bytes_after,
+          bytes_reclaimed, freelist_pages_before, freelist_pages_after
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+      ''', (
+        run['started_at'], trigger, json.dumps(steps), run['duration_ms'], run['bytes_before'],
+        run['bytes_after'], run['bytes_reclaimed'], run['freelist_pages_before'], run['freelist_pages_after']
+      ))
+    except sqlite3.OperationalError as e:
+      # Migration 0002 not applied yet, the run still happened
+      print(f"Could not record maintenance run: {str(e)}")
+    return run
+  finally:
+    conn.close()
+
+def last_run(database):
+  conn = sqlite3.connect(database)
+  try:
+    row = conn.execute('SELECT MAX(started_at) FROM maintenance_runs').fetchone()
+  except sqlite3.OperationalError:
+    return None
+  finally:
+    conn.close()
+  if not row or not row[0]:
+    return None
+  return datetime.strptime(row[0], '%Y-%m-%d %H:%M:%S')
+
+def in_window(now, window):
+  start_hour, end_hour = window
+  if start_hour <= end_hour:
+    return start_hour <= now.hour < end_hour
+  # Window wrapping midnight, e.g. (22, 4)
+  return now.hour >= start_hour or now.hour < end_hour
+
+def window_start(now, window):
+  """Start of the window that now falls in; one wrapping midnight may have started yesterday"""
+  start = now.replace(hour=window[0], minute=0, second=0, microsecond=0)
+  if start > now:
+    start -= timedelta(days=1)
+  return start
+
+def in_serving_process(debug):
+  """
+  False in the file-watching parent of the debug reloader, which imports the
+  app just like the child process that serves requests
+  """
+  return not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+class MaintenanceScheduler(threading.Thread):
+  """Runs maintenance in the background once a day, inside the off-peak window"""
+
+  def __init__(self, database, window=(2, 5), check_every=300):
+    super().__init__(name='db-maintenance', daemon=True)
+    self.database = database
+    self.window = window  # (start hour, end hour) in local time
+    self.check_every = check_every  # seconds between checks
+    self.stopped = threading.Event()
+
+  def due(self, now):
+    if not in_window(now, self.window):
+      return False
+    # Once per window rather than 24h after the last run, which would drift
+    # later each day and skip a day once it fell past the window. The last run
+    # is read from the database so restarts don't cause extra runs.
+    previous = last_run(self.database)
+    return previous is None or previous < window_start(now, self.window)
+
+  def run(self):
+    while not self.stopped.wait(self.check_every):
+      try:
+        if self.due(datetime.now()):
+          result = run_maintenance(self.database, trigger='scheduler')
+          print(f"Database maintenance finished in {result['duration_ms']} ms, "
+                f"reclaimed {result['bytes_reclaimed']} bytes")
+      except Exception as e:
+        print(f"Error running database maintenance: {str(e)}")
+
+  def stop(self):
+    self.stopped.set()
@@ -0,0 +1,79 @@
+import time
+from flask import g, has_app_context, request
+from prometheus_client import Counter, Gauge, Histogram
+
+# Request level metrics, labelled by the route rule (e.g. /groups/<int:id>)
+# rather than the raw path so that ids don't explode the label cardinality
+REQUEST_LATENCY = Histogram(
+  'http_request_duration_seconds',
+  'Time spent handling a request',
+  ['method', 'route', 'status']
+)
+
+REQUEST_DB_TIME = Histogram(
+  'http_request_db_seconds',
+  'Time spent inside SQLite calls while handling a request',
+  ['method', 'route'],
+  buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0)
+)
+
+RESPONSE_SIZE = Histogram(
+  'http_response_size_bytes',
+  'Size of the response body',
+  ['method', 'route'],
+  buckets=(128, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+  'http_requests_in_flight',
+  'Requests currently being handled'
+)
+
+# SQLite contention metrics, incremented from lib/db.py
+SQLITE_LOCK_RETRIES = Counter(
+  'sqlite_lock_retries_total',
+  'Statements retried because the database was busy or locked'
+)
+
+SQLITE_BUSY_ERRORS = Counter(
+  'sqlite_busy_errors_total',
+  'Statements that still failed with a busy/locked error after retrying'
+)
+
+def add_db_time(seconds):
+  # Called for every statement, also outside of requests (e.g. invoke tasks)
+  if has_app_context() and 'db_time' in g:
+    g.db_time += seconds
+
+def _route():
+  if request.url_rule is not None:
+    return request.url_rule.rule
+  return 'unmatched'
+
+def instrument(app):
+  @app.before_request
+  def start_timer():
+    g.request_start = time.perf_counter()
+    g.db_time = 0.0
+    REQUESTS_IN_FLIGHT.inc()
+
+  @app.after_request
+  def record_request(response):
+    if 'request_start' not in g:
+      return response
+
+    route = _route()
+    REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(
+      time.perf_counter() - g.request_start
+    )
+    REQUEST_DB_TIME.labels(request.method, route).observe(g.db_time)
+
+    # Streamed responses (e.g. event streams) have no known length
+    if not response.is_streamed:
+      RESPONSE_SIZE.labels(request.method, route).observe(response.calculate_content_length() or 0)
+    return response
+
+  @app.teardown_request
+  def stop_timer(exception):
+    if g.pop('request_start', None) is not None:
+      REQUESTS_IN_FLIGHT.dec()
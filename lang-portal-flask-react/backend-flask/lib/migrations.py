@@ -0,0 +1,120 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql', 'migrations')
+
+class MigrationError(Exception):
+  pass
+
+class Migration:
+  def __init__(self, path):
+    self.path = path
+    self.name = os.path.basename(path)
+    # Files are named <version>_<description>.sql, e.g. 0001_add_indexes.sql
+    self.version = self.name.split('_', 1)[0]
+    with open(path, 'r') as file:
+      self.sql = file.read()
+    self.checksum = hashlib.sha256(self.sql.encode('utf-8')).hexdigest()
+
+  def statements(self):
+    # Split the file into statements so they can run inside our own transaction
+    # (executescript always commits first). complete_statement keeps triggers
+    # with BEGIN ... END bodies together.
+    statement = ''
+    for line in self.sql.splitlines(keepends=True):
+      statement += line
+      if sqlite3.complete_statement(statement):
+        if statement.strip().strip(';').strip():
+          yield statement
+        statement = ''
+    if statement.strip():
+      yield statement
+
+def discover(migrations_dir=MIGRATIONS_DIR):
+  if not os.path.isdir(migrations_dir):
+    return []
+  files = [f for f in os.listdir(migrations_dir) if f.endswith('.sql')]
+  migrations = [Migration(os.path.join(migrations_dir, f)) for f in files]
+  migrations.sort(key=lambda m: (int(m.version) if m.version.isdigit() else m.version, m.name))
+  return migrations
+
+def applied_migrations(conn):
+  # The only query made when the schema is up to date
+  try:
+    rows = conn.execute('SELECT version, checksum FROM schema_migrations ORDER BY rowid').fetchall()
+  except sqlite3.OperationalError:
+    return None  # no ledger yet
+  return [(row[0], row[1]) for row in rows]
+
+def has_schema(database):
+  """Whether the core tables exist, i.e. the database was set up with init-db"""
+  if not os.path.exists(database):
+    return False
+  conn = sqlite3.connect(database)
+  try:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'words'").fetchone() is not None
+  finally:
+    conn.close()
+
+def create_ledger(conn):
+  conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+      version TEXT PRIMARY KEY,
+      name TEXT NOT NULL,
+      checksum TEXT NOT NULL,
+      applied_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+      duration_ms REAL
+    )
+  ''')
+
+def pending(conn, migrations):
+  applied = applied_migrations(conn) or []
+  applied_checksums = dict(applied)
+
+  # Refuse to continue if a migration that already ran was edited afterwards
+  for migration in migrations:
+    checksum = applied_checksums.get(migration.version)
+    if checksum is not None and checksum != migration.checksum:
+      raise MigrationError(
+        f"Migration {migration.name} was modified after being applied "
+        f"(checksum {checksum[:12]} != {migration.checksum[:12]})"
+      )
+  return [m for m in migrations if m.version not in applied_checksums]
+
+def apply(conn, migration):
+  start = time.perf_counter()
+  conn.execute('BEGIN IMMEDIATE')
+  try:
+    # Same transaction as the migration, so a failed first run leaves no empty ledger behind
+    create_ledger(conn)
+    for statement in migration.statements():
+      conn.execute(statement)
+    conn.execute('''
+      INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (?, ?, ?, ?)
+    ''', (migration.version, migration.name, migration.checksum, (time.perf_counter() - start) * 1000))
+    conn.execute('COMMIT')
+  except Exception as e:
+    conn.execute('ROLLBACK')
+    raise MigrationError(f"Migration {migration.name} failed: {str(e)}") from e
+
+def migrate(database, migrations_dir=MIGRATIONS_DIR, verbose=False):
+  """Apply pending migrations to the database, returns the names of the applied migrations"""
+  migrations = discover(migrations_dir)
+  # Autocommit mode so each migration controls its own transaction
+  conn = sqlite3.connect(database, isolation_level=None)
+  try:
+    # Fast path: a single query when every migration has been applied unchanged
+    if applied_migrations(conn) == [(m.version, m.checksum) for m in migrations]:
+      return []
+
+    applied = []
+    for migration in pending(conn, migrations):
+      if verbose:
+        print(f"Running migration: {migration.name}")
+      apply(conn, migration)
+      applied.append(migration.name)
+    return applied
+  finally:
+    conn.close()
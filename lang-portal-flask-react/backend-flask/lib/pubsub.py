@@ -0,0 +1,52 @@
+import queue
+import threading
+
+class PubSub:
+  """
+  In-process publish/subscribe used to push events to streaming clients.
+
+  Every subscriber gets its own bounded queue, so a publish is one write-side
+  notification no matter how many clients watch. Events only reach
+  subscribers in the same process.
+  """
+
+  def __init__(self, maxsize=100):
+    self.maxsize = maxsize
+    self.lock = threading.Lock()
+    self.subscribers = {}  # topic -> set of queues
+
+  def subscribe(self, topic):
+    q = queue.Queue(maxsize=self.maxsize)
+    with self.lock:
+      self.subscribers.setdefault(topic, set()).add(q)
+    return q
+
+  def unsubscribe(self, topic, q):
+    with self.lock:
+      subscribers = self.subscribers.get(topic)
+      if subscribers is not None:
+        subscribers.discard(q)
+        if not subscribers:
+          del self.subscribers[topic]
+
+  def has_subscribers(self, topic):
+    with self.lock:
+      return bool(self.subscribers.get(topic))
+
+  def publish(self, topic, event):
+    with self.lock:
+      subscribers = list(self.subscribers.get(topic, ()))
+    for q in subscribers:
+      try:
+        q.put_nowait(event)
+      except queue.Full:
+        # Slow client: drop its oldest event rather than block the writer
+        try:
+          q.get_nowait()
+        except queue.Empty:
+          pass
+        try:
+          q.put_nowait(event)
+        except queue.Full:
+          pass
+    return len(subscribers)
@@ -0,0 +1,80 @@
+import gzip
+import json
+from flask import Response, request
+
+# Optional faster encoders, the stdlib json module is used without them
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+try:
+  import msgpack
+except ImportError:
+  msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ['application/msgpack', 'application/x-msgpack']
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+
+def wants_msgpack():
+  if msgpack is None:
+    return False
+  best = request.accept_mimetypes.best_match([JSON_MIMETYPE] + MSGPACK_MIMETYPES, default=JSON_MIMETYPE)
+  return best in MSGPACK_MIMETYPES
+
+def json_field(text):
+  """
+  Value for a column that already holds JSON (e.g. words.parts).
+  orjson versions with Fragment embed it as is instead of parsing and re-encoding it.
+  """
+  if text is None:
+    return None
+  if orjson is not None and hasattr(orjson, 'Fragment') and not wants_msgpack():
+    return orjson.Fragment(text)
+  return json.loads(text)
+
+def requested_fields():
+  """Columns asked for with ?fields=a,b,c, None means all of them"""
+  fields = request.args.get('fields')
+  if not fields:
+    return None
+  return {field.strip() for field in fields.split(',') if field.strip()}
+
+def rows(cursor, columns=None, fields=None):
+  """
+  Build response items straight from the cursor's rows.
+
+  Items are keyed by the column names of the query (use SQL aliases to match
+  the API keys), restricted to columns and to the fields the client asked for.
+  """
+  names = [description[0] for description in cursor.description]
+  if columns is None:
+    columns = names
+  if fields is None:
+    fields = requested_fields()
+  selected = [(name, names.index(name)) for name in columns if fields is None or name in fields]
+  return [{name: row[index] for name, index in selected} for row in cursor.fetchall()]
+
+def dumps(payload):
+  if wants_msgpack():
+    return msgpack.packb(payload, use_bin_type=True), MSGPACK_MIMETYPES[0]
+  if orjson is not None:
+    return orjson.dumps(payload), JSON_MIMETYPE
+  return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), JSON_MIMETYPE
+
+def respond(payload, status=200):
+  """Serialize payload as JSON or MessagePack depending on Accept, gzip'd when large"""
+  body, mimetype = dumps(payload)
+  response = Response(body, status=status, mimetype=mimetype)
+  response.vary.add('Accept')
+
+  if len(body) >= GZIP_MIN_SIZE:
+    response.vary.add('Accept-Encoding')
+    if 'gzip' in request.accept_encodings:
+      response.set_data(gzip.compress(body, GZIP_LEVEL))
+      response.headers['Content-Encoding'] = 'gzip'
+  return response
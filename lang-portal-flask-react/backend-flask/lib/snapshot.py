@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from flask import g
+
+from lib.db import TimedCursor
+
+# Let clients read how stale snapshot data is
+SNAPSHOT_HEADERS = ['X-Snapshot-Age', 'X-Snapshot-Max-Age']
+
+class ReadSnapshot:
+  """
+  Periodically refreshed read-only copy of the database for analytics queries.
+
+  Long aggregations over word_review_items run against the copy, so they
+  don't hold read transactions on the live database and delay WAL
+  checkpoints. Exposes cursor()/close() like Db so routes can use either.
+  """
+
+  def __init__(self, database, path=None, max_age=30.0):
+    self.database = database
+    self.path = path or database + '.snapshot'
+    self.max_age = max_age  # seconds a response may lag behind the live database
+    self.refreshed_at = None
+    self.lock = threading.Lock()
+    self.stopped = threading.Event()
+    self.thread = None
+
+  def refresh(self):
+    with self.lock:
+      tmp = self.path + '.tmp'
+      source = sqlite3.connect(self.database)
+      target = sqlite3.connect(tmp)
+      try:
+        started_at = time.time()
+        source.backup(target)
+        # A read-only connection can't create the -shm file a WAL database needs
+        target.execute('PRAGMA journal_mode=DELETE')
+      finally:
+        target.close()
+        source.close()
+      # Connections still reading the old copy keep their file until they close
+      os.replace(tmp, self.path)
+      self.refreshed_at = started_at
+
+  def age(self):
+    if self.refreshed_at is None:
+      return None
+    return time.time() - self.refreshed_at
+
+  def ensure_fresh(self):
+    age = self.age()
+    if age is None or age > self.max_age:
+      self.refresh()
+
+  def start(self):
+    """Refresh in the background so requests don't wait for a copy"""
+    self.refresh()
+    self.thread = threading.Thread(target=self._run, name='read-snapshot', daemon=True)
+    self.thread.start()
+
+  def _run(self):
+    while not self.stopped.wait(self.max_age / 2):
+      try:
+        self.refresh()
+      except Exception as e:
+        print(f"Error refreshing read snapshot: {str(e)}")
+
+  def stop(self):
+    self.stopped.set()
+
+  def get(self):
+    if 'snapshot_db' not in g:
+      self.ensure_fresh()
+      g.snapshot_refreshed_at = self.refreshed_at
+      uri = 'file:' + urllib.parse.quote(os.path.abspath(self.path)) + '?mode=ro'
+      g.snapshot_db = sqlite3.connect(uri, uri=True)
+      g.snapshot_db.row_factory = sqlite3.Row
+    return g.snapshot_db
+
+  def cursor(self):
+    return self.get().cursor(factory=TimedCursor)
+
+  def close(self):
+    db = g.pop('snapshot_db', None)
+    if db is not None:
+      db.close()
+
+  def annotate(self, response, refreshed_at=None):
+    # Tell clients how stale the data they got may be. refreshed_at is
+    # passed for responses built from data read by an earlier request.
+    if refreshed_at is None:
+      refreshed_at = g.get('snapshot_refreshed_at')
+    if refreshed_at is not None:
+      response.headers['X-Snapshot-Age'] = f'{time.time() - refreshed_at:.3f}'
+      response.headers['X-Snapshot-Max-Age'] = f'{self.max_age:.3f}'
+    return response
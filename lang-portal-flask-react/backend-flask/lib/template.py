@@ -0,0 +1,117 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+
+from lib.db import SETUP_TABLES, SEED_WORD_GROUPS, SEED_STUDY_ACTIVITIES
+from lib.migrations import MIGRATIONS_DIR, migrate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(ROOT, 'build', 'words.template.db')
+
+def _path(relative):
+  return os.path.join(ROOT, relative)
+
+def source_files():
+  # Everything that ends up in the template; changing any of it invalidates it
+  files = [_path('sql/' + f) for f in SETUP_TABLES]
+  files += [_path(path) for _, path in SEED_WORD_GROUPS]
+  files.append(_path(SEED_STUDY_ACTIVITIES))
+  files += sorted(glob.glob(os.path.join(MIGRATIONS_DIR, '*.sql')))
+  files.append(os.path.abspath(__file__))
+  return files
+
+def fingerprint():
+  digest = hashlib.sha256()
+  for path in source_files():
+    digest.update(os.path.relpath(path, ROOT).encode('utf-8'))
+    with open(path, 'rb') as file:
+      digest.update(file.read())
+  return digest.hexdigest()
+
+def _fingerprint_path(template):
+  return template + '.sha256'
+
+def is_fresh(template=TEMPLATE_PATH):
+  try:
+    with open(_fingerprint_path(template), 'r') as file:
+      return os.path.exists(template) and file.read().strip() == fingerprint()
+  except FileNotFoundError:
+    return False
+
+def _load_json(relative):
+  with open(_path(relative), 'r') as file:
+    return json.load(file)
+
+def _seed(conn):
+  for filepath in SETUP_TABLES:
+    with open(_path('sql/' + filepath), 'r') as file:
+      conn.execute(file.read())
+
+  for group_name, data_json_path in SEED_WORD_GROUPS:
+    group_id = conn.execute('INSERT INTO groups (name) VALUES (?)', (group_name,)).lastrowid
+    for word in _load_json(data_json_path):
+      word_id = conn.execute('''
+        INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, ?)
+      ''', (word['kanji'], word['romaji'], word['english'], json.dumps(word['parts']))).lastrowid
+      conn.execute('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', (word_id, group_id))
+    conn.execute('''
+      UPDATE groups SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = ?) WHERE id = ?
+    ''', (group_id, group_id))
+
+  conn.executemany('''
+    INSERT INTO study_activities (name, url, preview_url) VALUES (?, ?, ?)
+  ''', [(a['name'], a['url'], a['preview_url']) for a in _load_json(SEED_STUDY_ACTIVITIES)])
+
+def build(template=TEMPLATE_PATH):
+  """Build the seeded, migrated and compacted template database"""
+  os.makedirs(os.path.dirname(template), exist_ok=True)
+  tmp = template + '.tmp'
+  if os.path.exists(tmp):
+    os.unlink(tmp)
+
+  conn = sqlite3.connect(tmp, isolation_level=None)
+  try:
+    # Must be set before the first table is created, lets lib/maintenance.py
+    # release free pages with an incremental vacuum
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
+    # Schema and seeds in one transaction instead of a commit per statement
+    conn.execute('BEGIN')
+    _seed(conn)
+    conn.execute('COMMIT')
+  finally:
+    conn.close()
+
+  migrate(tmp)
+
+  conn = sqlite3.connect(tmp, isolation_level=None)
+  try:
+    # Give the planner statistics and store the file without free pages
+    conn.execute('ANALYZE')
+    conn.execute('VACUUM')
+  finally:
+    conn.close()
+
+  os.replace(tmp, template)
+  with open(_fingerprint_path(template), 'w') as file:
+    file.write(fingerprint())
+  return template
+
+def ensure(template=TEMPLATE_PATH):
+  """Return the template path, rebuilding it first if the seeds or SQL changed"""
+  if not is_fresh(template):
+    build(template)
+  return template
+
+def clone(database, template=TEMPLATE_PATH):
+  """Copy the template into the given database file using the SQLite backup API"""
+  source = sqlite3.connect(ensure(template))
+  target = sqlite3.connect(database)
+  try:
+    source.backup(target)
+  finally:
+    target.close()
+    source.close()
+  return database
@@ -0,0 +1,241 @@
+"""
+Replays study-activity traffic against the backend with many concurrent learners.
+
+Each learner creates a study session, fetches the raw words of the group,
+logs reviews at a human pace and periodically polls the dashboard, the same
+way the typing tutor and the frontend do.
+
+Examples:
+
+    # Start an in-process server on a copy of words.db using WAL
+    python loadtest.py --workers 200 --duration 60 --journal-mode wal
+
+    # Run against an already running server
+    python loadtest.py --url http://127.0.0.1:5000 --workers 50
+
+Results are printed and, with --output, appended as one JSON line per run so
+runs with different worker counts and journal modes can be compared.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # operation -> list of latencies in seconds
+        self.errors = {}  # operation -> count of failed requests
+        self.locked_errors = 0
+
+    def record(self, operation, latency, ok, locked):
+        with self.lock:
+            self.samples.setdefault(operation, []).append(latency)
+            if not ok:
+                self.errors[operation] = self.errors.get(operation, 0) + 1
+            if locked:
+                self.locked_errors += 1
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class Client:
+    def __init__(self, base_url, recorder, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+
+    def request(self, operation, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(
+            self.base_url + path,
+            data=data,
+            method=method,
+            headers={'Content-Type': 'application/json'}
+        )
+        start = time.perf_counter()
+        status, payload = 0, b''
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except Exception as e:
+            payload = str(e).encode('utf-8')
+        latency = time.perf_counter() - start
+
+        locked = b'database is locked' in payload
+        ok = 200 <= status < 300
+        self.recorder.record(operation, latency, ok, locked)
+        if not ok:
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+def think(args):
+    # Human pace: reviews are spread around the configured think time
+    if args.think_time > 0:
+        time.sleep(random.uniform(0.5, 1.5) * args.think_time)
+
+def learner(client, args, groups, activities, deadline):
+    while time.time() < deadline:
+        group_id = random.choice(groups)
+        session = client.request('create_session', 'POST', '/study_sessions', {
+            'group_id': group_id,
+            'study_activity_id': random.choice(activities)
+        })
+        raw = client.request('group_words_raw', 'GET', f'/api/groups/{group_id}/words/raw')
+        if not session or not raw or not raw.get('words'):
+            think(args)
+            continue
+
+        word_ids = [word['id'] for word in raw['words']]
+        for review in range(1, args.reviews_per_session + 1):
+            if time.time() >= deadline:
+                return
+            think(args)
+            client.request('log_review', 'POST', f"/study_sessions/{session['session_id']}/review", {
+                'word_id': random.choice(word_ids),
+                'correct': random.random() < 0.7
+            })
+            if args.dashboard_every and review % args.dashboard_every == 0:
+                client.request('dashboard_recent', 'GET', '/dashboard/recent-session')
+                client.request('dashboard_stats', 'GET', '/dashboard/stats')
+
+def start_server(args):
+    """Serve the app in-process on a scratch copy of the database"""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    database = os.path.join(workdir, 'words.db')
+    shutil.copyfile(args.database, database)
+
+    app = create_app({
+        'DATABASE': database,
+        'JOURNAL_MODE': args.journal_mode,
+        'BUSY_TIMEOUT': args.busy_timeout
+    })
+    # Keep the per-request access log out of the report
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, workdir, f'http://127.0.0.1:{server.server_port}'
+
+def summarize(recorder, elapsed):
+    operations = {}
+    all_latencies = []
+    for operation, latencies in sorted(recorder.samples.items()):
+        latencies = sorted(latencies)
+        all_latencies.extend(latencies)
+        operations[operation] = {
+            'count': len(latencies),
+            'errors': recorder.errors.get(operation, 0),
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2)
+        }
+    all_latencies.sort()
+    return {
+        'requests': len(all_latencies),
+        'errors': sum(recorder.errors.values()),
+        'locked_errors': recorder.locked_errors,
+        'throughput_rps': round(len(all_latencies) / elapsed, 2),
+        'p50_ms': round(percentile(all_latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(all_latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(all_latencies, 99) * 1000, 2),
+        'operations': operations
+    }
+
+def print_report(config, summary):
+    print(f"\nworkers={config['workers']} journal_mode={config['journal_mode']} "
+          f"duration={config['elapsed_s']}s think_time={config['think_time']}s")
+    print(f"{'operation':<18}{'count':>8}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for operation, stats in summary['operations'].items():
+        print(f"{operation:<18}{stats['count']:>8}{stats['errors']:>8}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['max_ms']:>9}")
+    print(f"\ntotal: {summary['requests']} requests, {summary['throughput_rps']} req/s, "
+          f"p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms, "
+          f"{summary['errors']} errors, {summary['locked_errors']} 'database is locked'")
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent study-activity load generator')
+    parser.add_argument('--url', help='Base url of a running backend (default: start one in-process)')
+    parser.add_argument('--database', default='words.db', help='Database copied for the in-process server')
+    parser.add_argument('--journal-mode', default=None, help='SQLite journal mode for the in-process server (delete, wal, ...)')
+    parser.add_argument('--busy-timeout', type=float, default=5.0, help='SQLite busy timeout in seconds for the in-process server')
+    parser.add_argument('--workers', type=int, default=200, help='Number of concurrent learners')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run for')
+    parser.add_argument('--ramp-up', type=float, default=5.0, help='Seconds over which learners are started')
+    parser.add_argument('--think-time', type=float, default=1.0, help='Mean seconds between reviews')
+    parser.add_argument('--reviews-per-session', type=int, default=20)
+    parser.add_argument('--dashboard-every', type=int, default=10, help='Poll the dashboard every N reviews (0 disables)')
+    parser.add_argument('--output', help='Append the results as a JSON line to this file')
+    args = parser.parse_args()
+
+    server, workdir = None, None
+    base_url = args.url
+    if not base_url:
+        server, workdir, base_url = start_server(args)
+
+    try:
+        recorder = Recorder()
+        setup = Client(base_url, Recorder())
+        groups = [group['id'] for group in (setup.request('setup', 'GET', '/groups') or {}).get('groups', [])]
+        activities = [activity['id'] for activity in setup.request('setup', 'GET', '/api/study-activities') or []]
+        if not groups or not activities:
+            raise SystemExit('No groups or study activities found, run `invoke init-db` first')
+
+        client = Client(base_url, recorder)
+        start = time.time()
+        deadline = start + args.duration
+        threads = []
+        for i in range(args.workers):
+            thread = threading.Thread(target=learner, args=(client, args, groups, activities, deadline), daemon=True)
+            thread.start()
+            threads.append(thread)
+            if args.ramp_up > 0:
+                time.sleep(args.ramp_up / args.workers)
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+    finally:
+        if server:
+            server.shutdown()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    config = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'url': args.url or 'in-process',
+        'workers': args.workers,
+        'journal_mode': args.journal_mode or 'default',
+        'busy_timeout': args.busy_timeout,
+        'think_time': args.think_time,
+        'reviews_per_session': args.reviews_per_session,
+        'dashboard_every': args.dashboard_every,
+        'elapsed_s': round(elapsed, 2)
+    }
+    summary = summarize(recorder, elapsed)
+    print_report(config, summary)
+
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps({**config, **summary}) + '\n')
+
+if __name__ == '__main__':
+    main()
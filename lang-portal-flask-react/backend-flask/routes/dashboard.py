@@ -2,12 +2,22 @@ from flask import jsonify
 from flask_cors import cross_origin
 from datetime import datetime, timedelta
 
+from lib.coalesce import coalesced
+from lib.snapshot import SNAPSHOT_HEADERS
+
 def load(app):
+    def respond(payload):
+        response = jsonify(payload)
+        if hasattr(app.analytics_db, 'annotate'):
+            app.analytics_db.annotate(response)
+        return response
+
     @app.route('/dashboard/recent-session', methods=['GET'])
-    @cross_origin()
+    @cross_origin(expose_headers=SNAPSHOT_HEADERS)
+    @coalesced(app)
     def get_recent_session():
         try:
-            cursor = app.db.cursor()
+            cursor = app.analytics_db.cursor()
             
             # Get the most recent study session with activity name and results
             cursor.execute('''
@@ -29,9 +39,9 @@ def load(app):
             session = cursor.fetchone()
             
             if not session:
-                return jsonify(None)
+                return respond(None)
             
-            return jsonify({
+            return respond({
                 "id": session["id"],
                 "group_id": session["group_id"],
                 "activity_name": session["activity_name"],
@@ -44,10 +54,11 @@ def load(app):
             return jsonify({"error": str(e)}), 500
 
     @app.route('/dashboard/stats', methods=['GET'])
-    @cross_origin()
+    @cross_origin(expose_headers=SNAPSHOT_HEADERS)
+    @coalesced(app)
     def get_study_stats():
         try:
-            cursor = app.db.cursor()
+            cursor = app.analytics_db.cursor()
             
             # Get total vocabulary count
             cursor.execute('SELECT COUNT(*) as total_vocabulary FROM words')
@@ -125,7 +136,7 @@ def load(app):
             ''')
             current_streak = cursor.fetchone()["streak"]
             
-            return jsonify({
+            return respond({
                 "total_vocabulary": total_vocabulary,
                 "total_words_studied": total_words,
                 "mastered_words": mastered_words,
@@ -2,9 +2,13 @@ from flask import request, jsonify, g
 from flask_cors import cross_origin
 import json
 
+from lib.serialize import respond, rows, json_field
+from lib.coalesce import coalesced
+
 def load(app):
   @app.route('/groups', methods=['GET'])
   @cross_origin()
+  @coalesced(app)
   def get_groups():
     try:
       cursor = app.db.cursor()
@@ -27,30 +31,21 @@ def load(app):
 
       # Query to fetch groups with sorting and the cached word count
       cursor.execute(f'''
-        SELECT id, name, words_count
+        SELECT id, name as group_name, words_count as word_count
         FROM groups
         ORDER BY {sort_by} {order}
         LIMIT ? OFFSET ?
       ''', (groups_per_page, offset))
 
-      groups = cursor.fetchall()
+      groups_data = rows(cursor)
 
       # Query the total number of groups
       cursor.execute('SELECT COUNT(*) FROM groups')
       total_groups = cursor.fetchone()[0]
       total_pages = (total_groups + groups_per_page - 1) // groups_per_page
 
-      # Format the response
-      groups_data = []
-      for group in groups:
-        groups_data.append({
-          "id": group["id"],
-          "group_name": group["name"],
-          "word_count": group["words_count"]
-        })
-
       # Return groups and pagination metadata
-      return jsonify({
+      return respond({
         'groups': groups_data,
         'total_pages': total_pages,
         'current_page': page
@@ -113,7 +108,7 @@ def load(app):
 
       # Query to fetch words with pagination and sorting
       cursor.execute(f'''
-        SELECT w.*, 
+        SELECT w.id, w.kanji, w.romaji, w.english,
                COALESCE(wr.correct_count, 0) as correct_count,
                COALESCE(wr.wrong_count, 0) as wrong_count
         FROM words w
@@ -124,7 +119,7 @@ def load(app):
         LIMIT ? OFFSET ?
       ''', (id, words_per_page, offset))
       
-      words = cursor.fetchall()
+      words_data = rows(cursor)
 
       # Get total words count for pagination
       cursor.execute('''
@@ -135,19 +130,7 @@ def load(app):
       total_words = cursor.fetchone()[0]
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "kanji": word["kanji"],
-          "romaji": word["romaji"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
-
-      return jsonify({
+      return respond({
         'words': words_data,
         'total_pages': total_pages,
         'current_page': page
@@ -167,35 +150,24 @@ def load(app):
       if not group:
         return jsonify({"error": "Group not found"}), 404
 
-      # SQL query to fetch words along with group information
+      # SQL query to fetch the words of the group
       cursor.execute('''
-        SELECT g.id as group_id, g.name as group_name, w.*
-        FROM groups g
-        JOIN word_groups wg ON g.id = wg.group_id
+        SELECT w.id, w.kanji, w.romaji, w.english, w.parts
+        FROM word_groups wg
         JOIN words w ON w.id = wg.word_id
-        WHERE g.id = ?;
+        WHERE wg.group_id = ?;
       ''', (id,))
       
-      data = cursor.fetchall()
+      words = rows(cursor)
+      for word in words:
+        if 'parts' in word:
+          word['parts'] = json_field(word['parts'])  # Stored as a JSON string
       
-      # Format the response
-      result = {
+      return respond({
         "group_id": id,
-        "group_name": data[0]["group_name"] if data else group["name"],
-        "words": []
-      }
-      
-      for row in data:
-        word = {
-          "id": row["id"],
-          "kanji": row["kanji"],
-          "romaji": row["romaji"],
-          "english": row["english"],
-          "parts": json.loads(row["parts"])  # Deserialize 'parts' field
-        }
-        result["words"].append(word)
-      
-      return jsonify(result)
+        "group_name": group["name"],
+        "words": words
+      })
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
@@ -214,17 +186,17 @@ def load(app):
       sort_by = request.args.get('sort_by', 'created_at')
       order = request.args.get('order', 'desc')  # Default to newest first
 
-      # Map frontend sort keys to database columns
+      # Map frontend sort keys to result columns
       sort_mapping = {
-        'startTime': 'created_at',
+        'startTime': 'start_time',
         'endTime': 'last_activity_time',
-        'activityName': 'a.name',
-        'groupName': 'g.name',
-        'reviewItemsCount': 'review_count'
+        'activityName': 'activity_name',
+        'groupName': 'group_name',
+        'reviewItemsCount': 'review_items_count'
       }
 
-      # Use mapped sort column or default to created_at
-      sort_column = sort_mapping.get(sort_by, 'created_at')
+      # Use mapped sort column or default to start_time
+      sort_column = sort_mapping.get(sort_by, 'start_time')
 
       # Get total count for pagination
       cursor.execute('''
@@ -235,54 +207,45 @@ def load(app):
       total_sessions = cursor.fetchone()[0]
       total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
 
-      # Get study sessions for this group with dynamic calculations
+      # Get study sessions for this group with dynamic calculations.
+      # Sessions without reviews end 30 minutes after they started.
       cursor.execute(f'''
-        SELECT 
-          s.id,
-          s.group_id,
-          s.study_activity_id,
-          s.created_at as start_time,
-          (
-            SELECT MAX(created_at)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as last_activity_time,
-          a.name as activity_name,
-          g.name as group_name,
-          (
-            SELECT COUNT(*)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as review_count
-        FROM study_sessions s
-        JOIN study_activities a ON s.study_activity_id = a.id
-        JOIN groups g ON s.group_id = g.id
-        WHERE s.group_id = ?
+        SELECT
+          *,
+          COALESCE(last_activity_time, datetime(start_time, '+30 minutes')) as end_time
+        FROM (
+          SELECT 
+            s.id,
+            s.group_id,
+            s.study_activity_id,
+            s.created_at as start_time,
+            (
+              SELECT MAX(created_at)
+              FROM word_review_items
+              WHERE study_session_id = s.id
+            ) as last_activity_time,
+            a.name as activity_name,
+            g.name as group_name,
+            (
+              SELECT COUNT(*)
+              FROM word_review_items
+              WHERE study_session_id = s.id
+            ) as review_items_count
+          FROM study_sessions s
+          JOIN study_activities a ON s.study_activity_id = a.id
+          JOIN groups g ON s.group_id = g.id
+          WHERE s.group_id = ?
+        )
         ORDER BY {sort_column} {order}
         LIMIT ? OFFSET ?
       ''', (id, sessions_per_page, offset))
       
-      sessions = cursor.fetchall()
-      sessions_data = []
-      
-      for session in sessions:
-        # If there's no last_activity_time, use start_time + 30 minutes
-        end_time = session["last_activity_time"]
-        if not end_time:
-            end_time = cursor.execute('SELECT datetime(?, "+30 minutes")', (session["start_time"],)).fetchone()[0]
-        
-        sessions_data.append({
-          "id": session["id"],
-          "group_id": session["group_id"],
-          "group_name": session["group_name"],
-          "study_activity_id": session["study_activity_id"],
-          "activity_name": session["activity_name"],
-          "start_time": session["start_time"],
-          "end_time": end_time,
-          "review_items_count": session["review_count"]
-        })
+      sessions_data = rows(cursor, columns=[
+        'id', 'group_id', 'group_name', 'study_activity_id', 'activity_name',
+        'start_time', 'end_time', 'review_items_count'
+      ])
 
-      return jsonify({
+      return respond({
         'study_sessions': sessions_data,
         'total_pages': total_pages,
         'current_page': page
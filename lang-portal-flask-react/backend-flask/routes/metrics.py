@@ -0,0 +1,7 @@
+from flask import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+def load(app):
+  @app.route('/metrics', methods=['GET'])
+  def get_metrics():
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
@@ -2,6 +2,8 @@ from flask import jsonify, request
 from flask_cors import cross_origin
 import math
 
+from lib.serialize import respond, rows
+
 def load(app):
     @app.route('/api/study-activities', methods=['GET'])
     @cross_origin()
@@ -65,8 +67,9 @@ def load(app):
                 ss.group_id,
                 g.name as group_name,
                 sa.name as activity_name,
-                ss.created_at,
                 ss.study_activity_id as activity_id,
+                ss.created_at as start_time,
+                ss.created_at as end_time,  -- For now, just use the same time since we don't track end time
                 COUNT(wri.id) as review_items_count
             FROM study_sessions ss
             JOIN groups g ON g.id = ss.group_id
@@ -77,19 +80,9 @@ def load(app):
             ORDER BY ss.created_at DESC
             LIMIT ? OFFSET ?
         ''', (id, per_page, offset))
-        sessions = cursor.fetchall()
 
-        return jsonify({
-            'items': [{
-                'id': session['id'],
-                'group_id': session['group_id'],
-                'group_name': session['group_name'],
-                'activity_id': session['activity_id'],
-                'activity_name': session['activity_name'],
-                'start_time': session['created_at'],
-                'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-                'review_items_count': session['review_items_count']
-            } for session in sessions],
+        return respond({
+            'items': rows(cursor),
             'total': total_count,
             'page': page,
             'per_page': per_page,
@@ -1,7 +1,39 @@
-from flask import request, jsonify, g
+from flask import request, jsonify, g, Response
 from flask_cors import cross_origin
 from datetime import datetime
+import json
 import math
+import queue
+
+from lib.serialize import respond, rows
+
+# Seconds between keep-alive comments on idle event streams
+EVENTS_HEARTBEAT = 15
+
+def session_topic(id):
+  return f'study_session:{id}'
+
+def session_counters(cursor, id):
+  cursor.execute('''
+    SELECT
+      COUNT(*) as review_items_count,
+      COALESCE(SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END), 0) as correct_count,
+      COALESCE(SUM(CASE WHEN correct = 0 THEN 1 ELSE 0 END), 0) as wrong_count
+    FROM word_review_items
+    WHERE study_session_id = ?
+  ''', (id,))
+  counters = cursor.fetchone()
+  return {
+    'review_items_count': counters['review_items_count'],
+    'correct_count': counters['correct_count'],
+    'wrong_count': counters['wrong_count']
+  }
+
+def sse(event, data, event_id=None):
+  message = f'event: {event}\n'
+  if event_id is not None:
+    message += f'id: {event_id}\n'
+  return message + f'data: {json.dumps(data)}\n\n'
 
 def load(app):
   @app.route('/study_sessions', methods=['POST'])
@@ -79,7 +111,8 @@ def load(app):
           g.name as group_name,
           sa.id as activity_id,
           sa.name as activity_name,
-          ss.created_at,
+          ss.created_at as start_time,
+          ss.created_at as end_time,  -- For now, just use the same time since we don't track end time
           COUNT(wri.id) as review_items_count
         FROM study_sessions ss
         JOIN groups g ON g.id = ss.group_id
@@ -89,19 +122,9 @@ def load(app):
         ORDER BY ss.created_at DESC
         LIMIT ? OFFSET ?
       ''', (per_page, offset))
-      sessions = cursor.fetchall()
 
-      return jsonify({
-        'items': [{
-          'id': session['id'],
-          'group_id': session['group_id'],
-          'group_name': session['group_name'],
-          'activity_id': session['activity_id'],
-          'activity_name': session['activity_name'],
-          'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-          'review_items_count': session['review_items_count']
-        } for session in sessions],
+      return respond({
+        'items': rows(cursor),
         'total': total_count,
         'page': page,
         'per_page': per_page,
@@ -146,9 +169,12 @@ def load(app):
       # Get the words reviewed in this session with their review status
       cursor.execute('''
         SELECT 
-          w.*,
-          COALESCE(SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END), 0) as session_correct_count,
-          COALESCE(SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END), 0) as session_wrong_count
+          w.id,
+          w.kanji,
+          w.romaji,
+          w.english,
+          COALESCE(SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END), 0) as correct_count,
+          COALESCE(SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END), 0) as wrong_count
         FROM words w
         JOIN word_review_items wri ON wri.word_id = w.id
         WHERE wri.study_session_id = ?
@@ -157,7 +183,7 @@ def load(app):
         LIMIT ? OFFSET ?
       ''', (id, per_page, offset))
       
-      words = cursor.fetchall()
+      words = rows(cursor)
 
       # Get total count of words
       cursor.execute('''
@@ -169,7 +195,7 @@ def load(app):
       
       total_count = cursor.fetchone()['count']
 
-      return jsonify({
+      return respond({
         'session': {
           'id': session['id'],
           'group_id': session['group_id'],
@@ -180,14 +206,7 @@ def load(app):
           'end_time': session['created_at'],  # For now, just use the same time
           'review_items_count': session['review_items_count']
         },
-        'words': [{
-          'id': word['id'],
-          'kanji': word['kanji'],
-          'romaji': word['romaji'],
-          'english': word['english'],
-          'correct_count': word['session_correct_count'],
-          'wrong_count': word['session_wrong_count']
-        } for word in words],
+        'words': words,
         'total': total_count,
         'page': page,
         'per_page': per_page,
@@ -199,54 +218,112 @@ def load(app):
   @app.route('/study_sessions/<id>/review', methods=['POST'])
   @cross_origin()
   def log_review(id):
-    cursor = app.db.cursor()
+    try:
+      cursor = app.db.cursor()
+
+      word_id = request.json.get('word_id')
+      correct = request.json.get('correct')
 
-    word_id = request.json.get('word_id')
-    correct = request.json.get('correct')
-        
-    if word_id is None or correct is None:
+      if word_id is None or correct is None:
         return jsonify({"error": "word_id and correct fields are required"}), 400
 
-    # Check if word exists
-    cursor.execute('SELECT id FROM words WHERE id = ?', (word_id,))
-    if not cursor.fetchone():
+      # Check if word exists
+      cursor.execute('SELECT id FROM words WHERE id = ?', (word_id,))
+      if not cursor.fetchone():
         return jsonify({"error": "Word not found"}), 404
 
-    # Check if study session exists
-    cursor.execute('SELECT id FROM study_sessions WHERE id = ?', (id,))
-    if not cursor.fetchone():
+      # Check if study session exists
+      cursor.execute('SELECT id FROM study_sessions WHERE id = ?', (id,))
+      if not cursor.fetchone():
         return jsonify({"error": "Study session not found"}), 404
 
-    # Insert the individual review attempt into word_review_items
-    cursor.execute('''
+      # Insert the individual review attempt into word_review_items
+      cursor.execute('''
         INSERT INTO word_review_items (word_id, correct, study_session_id) VALUES (?, ?, ?)
-    ''', (word_id, correct, id))
-    
-    # Update or insert aggregate review record in word_reviews
-    cursor.execute('''
+      ''', (word_id, correct, id))
+      review_item_id = cursor.lastrowid
+
+      # Update or insert aggregate review record in word_reviews
+      cursor.execute('''
         SELECT * FROM word_reviews WHERE word_id = ?
-    ''', (word_id,))
-    review = cursor.fetchone()
+      ''', (word_id,))
+      review = cursor.fetchone()
 
-    if review:
+      if review:
         # Update existing record
         if correct:
-            cursor.execute('''
-           UPDATE word_reviews SET correct_count = correct_count + 1, last_reviewed = ? WHERE word_id = ?
-            ''', (datetime.now(), word_id))
+          cursor.execute('''
+            UPDATE word_reviews SET correct_count = correct_count + 1, last_reviewed = ? WHERE word_id = ?
+          ''', (datetime.now(), word_id))
         else:
-            cursor.execute('''
-                UPDATE word_reviews SET wrong_count = wrong_count + 1, last_reviewed = ? WHERE word_id = ?
-            ''', (datetime.now(), word_id))
-    else:
+          cursor.execute('''
+            UPDATE word_reviews SET wrong_count = wrong_count + 1, last_reviewed = ? WHERE word_id = ?
+          ''', (datetime.now(), word_id))
+      else:
         # Insert new record
         cursor.execute('''
-            INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
-            VALUES (?, ?, ?, ?)
+          INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+          VALUES (?, ?, ?, ?)
         ''', (word_id, 1 if correct else 0, 0 if correct else 1, datetime.now()))
 
-    app.db.commit()
-    return jsonify({"message": "Review logged successfully"})
+      app.db.commit()
+
+      # Push the review to anyone watching /study_sessions/<id>/events, the
+      # counters are computed once here instead of by every watcher
+      topic = session_topic(id)
+      if app.pubsub.has_subscribers(topic):
+        app.pubsub.publish(topic, {
+          'type': 'review',
+          'id': review_item_id,
+          'review': {
+            'id': review_item_id,
+            'word_id': word_id,
+            'correct': bool(correct)
+          },
+          'counters': session_counters(cursor, id)
+        })
+
+      return jsonify({"message": "Review logged successfully"})
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  @app.route('/study_sessions/<id>/events', methods=['GET'])
+  @cross_origin()
+  def study_session_events(id):
+    try:
+      cursor = app.db.cursor()
+
+      cursor.execute('SELECT id FROM study_sessions WHERE id = ?', (id,))
+      if not cursor.fetchone():
+        return jsonify({"error": "Study session not found"}), 404
+
+      counters = session_counters(cursor, id)
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+    finally:
+      # Don't hold a connection open for the lifetime of the stream
+      app.db.close()
+
+    topic = session_topic(id)
+    subscription = app.pubsub.subscribe(topic)
+
+    def stream():
+      try:
+        yield sse('counters', {'type': 'counters', 'counters': counters})
+        while True:
+          try:
+            event = subscription.get(timeout=EVENTS_HEARTBEAT)
+          except queue.Empty:
+            yield ': keep-alive\n\n'
+            continue
+          yield sse(event['type'], event, event.get('id'))
+      finally:
+        app.pubsub.unsubscribe(topic, subscription)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+      'Cache-Control': 'no-cache',
+      'X-Accel-Buffering': 'no'  # Don't let proxies buffer the stream
+    })
 
   @app.route('/api/study-sessions/reset', methods=['POST'])
   @cross_origin()
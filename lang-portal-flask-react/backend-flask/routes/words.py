@@ -2,6 +2,8 @@ from flask import request, jsonify, g
 from flask_cors import cross_origin
 import json
 
+from lib.serialize import respond, rows
+
 def load(app):
   # Endpoint: GET /words with pagination (50 words per page)
   @app.route('/words', methods=['GET'])
@@ -39,26 +41,14 @@ def load(app):
         LIMIT ? OFFSET ?
       ''', (words_per_page, offset))
 
-      words = cursor.fetchall()
+      words_data = rows(cursor)
 
       # Query the total number of words
       cursor.execute('SELECT COUNT(*) FROM words')
       total_words = cursor.fetchone()[0]
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "kanji": word["kanji"],
-          "romaji": word["romaji"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
-
-      return jsonify({
+      return respond({
         "words": words_data,
         "total_pages": total_pages,
         "current_page": page,
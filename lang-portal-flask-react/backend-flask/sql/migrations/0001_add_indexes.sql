@@ -0,0 +1,9 @@
+-- Indexes for the joins and filters used by the routes
+CREATE INDEX IF NOT EXISTS idx_word_review_items_study_session_id ON word_review_items(study_session_id);
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word_id ON word_review_items(word_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_id ON word_groups(group_id, word_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_word_id ON word_groups(word_id);
+CREATE INDEX IF NOT EXISTS idx_word_reviews_word_id ON word_reviews(word_id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id ON study_sessions(group_id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_study_activity_id ON study_sessions(study_activity_id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created_at ON study_sessions(created_at);
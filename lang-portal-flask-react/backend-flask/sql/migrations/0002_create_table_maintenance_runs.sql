@@ -0,0 +1,13 @@
+-- History of database maintenance runs (see lib/maintenance.py)
+CREATE TABLE IF NOT EXISTS maintenance_runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  started_at DATETIME NOT NULL,
+  triggered_by TEXT NOT NULL,  -- 'task' or 'scheduler'
+  steps TEXT NOT NULL,  -- JSON list of the steps that ran and their durations
+  duration_ms REAL NOT NULL,
+  bytes_before INTEGER NOT NULL,  -- database + WAL size before the run
+  bytes_after INTEGER NOT NULL,
+  bytes_reclaimed INTEGER NOT NULL,
+  freelist_pages_before INTEGER NOT NULL,
+  freelist_pages_after INTEGER NOT NULL
+);
@@ -1,9 +1,34 @@
+import os
 from invoke import task
 from lib.db import db
+from lib.migrations import migrate as run_migrations
+import lib.template
+import lib.maintenance
 
 @task
-def init_db(c):
-  from flask import Flask
-  app = Flask(__name__)
-  db.init(app)
-  print("Database initialized successfully.")
\ No newline at end of file
+def build_template(c):
+  lib.template.build()
+  print(f"Template database built at {lib.template.TEMPLATE_PATH}")
+
+@task
+def init_db(c, force=False):
+  # Clone the prebuilt template (rebuilt first if the seeds or SQL changed)
+  if os.path.exists(db.database) and os.path.getsize(db.database) > 0 and not force:
+    print(f"{db.database} already exists, use --force to replace it.")
+    return
+  lib.template.clone(db.database)
+  print("Database initialized successfully.")
+
+@task
+def migrate(c, database='words.db'):
+  applied = run_migrations(database, verbose=True)
+  print(f"Applied {len(applied)} migration(s)." if applied else "Database schema is up to date.")
+
+@task
+def maintain(c, database='words.db', vacuum_pages=0, convert=False):
+  # --convert rewrites older databases once so incremental vacuum can be used
+  run = lib.maintenance.run_maintenance(database, vacuum_pages=vacuum_pages, convert=convert)
+  for step in run['steps']:
+    print(f"{step['step']}: {step['duration_ms']} ms")
+  print(f"Maintenance finished in {run['duration_ms']} ms, reclaimed {run['bytes_reclaimed']} bytes "
+        f"({run['freelist_pages_before']} -> {run['freelist_pages_after']} free pages).")
@@ -1,29 +1,56 @@
 import boto3
 import json
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import tempfile
 import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from google.cloud import texttospeech
-from azure.cognitiveservices.speech import SpeechConfig, SpeechSynthesizer
-from azure.cognitiveservices.speech.audio import AudioOutputConfig
+
+from backend.llm_cache import CachedConverseClient, LLMCache
+from backend.mp3 import Mp3Assembler, Mp3Error
+from backend.tts_cache import ClipCache
+
+# Matches the frame format Mp3Assembler uses for silence when there are no clips
+POLLY_SAMPLE_RATE = '24000'
 
 class AudioGenerator:
-    def __init__(self):
+    def __init__(
+        self,
+        polly_client=None,
+        bedrock_client=None,
+        max_workers: int = 4,
+        clip_cache: Optional[Union[ClipCache, bool]] = None,
+        llm_cache: Optional[LLMCache] = None,
+    ):
         # AWS clients
-        self.bedrock = boto3.client('bedrock-runtime', region_name="us-east-1")
-        self.polly = boto3.client('polly')
+        # Parsing the same question into speaker parts should give the same
+        # script, so cache it even though it samples at a low temperature.
+        # A client passed in is only cached when llm_cache is passed too.
+        if bedrock_client is None or llm_cache is not None:
+            bedrock_client = CachedConverseClient(
+                bedrock_client or boto3.client('bedrock-runtime', region_name="us-east-1"),
+                cache=llm_cache,
+                allow_sampling=True
+            )
+        self.bedrock = bedrock_client
+        self.polly = polly_client or boto3.client('polly')
         self.model_id = "amazon.nova-micro-v1:0"
         
-        # Google Cloud TTS client
-        self.google_client = texttospeech.TextToSpeechClient()
+        # Number of parts synthesized at the same time
+        self.max_workers = max_workers
+        self.last_synthesis = None
         
-        # Azure TTS client
-        self.azure_speech_config = SpeechConfig(
-            subscription=os.getenv('AZURE_SPEECH_KEY'),
-            region=os.getenv('AZURE_SPEECH_REGION')
-        )
+        # Synthesized clips are reused across questions; pass clip_cache=False to disable
+        if clip_cache is None:
+            clip_cache = ClipCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tts_cache"))
+        self.clip_cache = clip_cache or None
+        
+        # Google Cloud and Azure TTS clients are created on first use
+        self._google_client = None
+        self._azure_speech_config = None
         
         # Define Japanese neural voices by gender and service
         self.voices = {
@@ -55,6 +82,25 @@ class AudioGenerator:
         )
         os.makedirs(self.audio_dir, exist_ok=True)
 
+    @property
+    def google_client(self):
+        """Google Cloud TTS client"""
+        if self._google_client is None:
+            from google.cloud import texttospeech
+            self._google_client = texttospeech.TextToSpeechClient()
+        return self._google_client
+
+    @property
+    def azure_speech_config(self):
+        """Azure TTS config"""
+        if self._azure_speech_config is None:
+            from azure.cognitiveservices.speech import SpeechConfig
+            self._azure_speech_config = SpeechConfig(
+                subscription=os.getenv('AZURE_SPEECH_KEY'),
+                region=os.getenv('AZURE_SPEECH_REGION')
+            )
+        return self._azure_speech_config
+
     def _invoke_bedrock(self, prompt: str) -> str:
         """Invoke Bedrock with the given prompt using converse API"""
         messages = [{
@@ -122,6 +168,8 @@ class AudioGenerator:
         Convert question into a format for audio generation.
         Returns a list of (speaker, text, gender) tuples.
         """
+        # The answer and explanations must not be read out
+        spoken = {key: value for key, value in question.items() if key not in ('Answer', 'Explanations')}
         max_retries = 3
         for attempt in range(max_retries):
             try:
@@ -154,7 +202,7 @@ class AudioGenerator:
                 ---
 
                 Question to format:
-                {json.dumps(question, ensure_ascii=False, indent=2)}
+                {json.dumps(spoken, ensure_ascii=False, indent=2)}
 
                 Output ONLY the formatted parts in order: introduction, conversation, question.
                 Make sure to specify gender EXACTLY as shown in the example.
@@ -247,18 +295,121 @@ class AudioGenerator:
 
     def generate_audio_part(self, text: str, voice_name: str) -> str:
         """Generate audio for a single part using Amazon Polly"""
+        audio, _ = self._synthesize(text, voice_name)
+        
+        # Save to temporary file
+        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
+            temp_file.write(audio)
+            return temp_file.name
+
+    def _synthesize(self, text: str, voice_name: str, engine: str = 'neural') -> Tuple[bytes, bool]:
+        """MP3 audio for a part and whether it came from the clip cache"""
+        if self.clip_cache is not None:
+            cached = self.clip_cache.get('aws-polly', voice_name, engine, text)
+            if cached:
+                try:
+                    with open(cached, 'rb') as f:
+                        return f.read(), True
+                except FileNotFoundError:
+                    # Evicted since the lookup, synthesize it again
+                    pass
+        
         response = self.polly.synthesize_speech(
             Text=text,
             OutputFormat='mp3',
+            # Every clip at the same rate, so they can be joined frame by frame
+            SampleRate=POLLY_SAMPLE_RATE,
             VoiceId=voice_name,
-            Engine='neural',
+            Engine=engine,
             LanguageCode='ja-JP'
         )
+        audio = response['AudioStream'].read()
         
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
-            temp_file.write(response['AudioStream'].read())
-            return temp_file.name
+        if self.clip_cache is not None:
+            self.clip_cache.put('aws-polly', voice_name, engine, text, audio)
+        return audio, False
+
+    def synthesize_parts(self, parts: List[Tuple[str, str]]) -> List[bytes]:
+        """
+        Synthesize (text, voice) parts concurrently, at most max_workers at a
+        time. Returns the MP3 audio in the order of parts and records each
+        part's latency in self.last_synthesis.
+        """
+        start = time.perf_counter()
+        timings = [None] * len(parts)
+        
+        def synthesize(index: int) -> bytes:
+            text, voice = parts[index]
+            part_start = time.perf_counter()
+            audio, cached = self._synthesize(text, voice)
+            if not audio:
+                raise Exception("Failed to generate audio part")
+            timings[index] = {
+                "part": index + 1,
+                "voice": voice,
+                "chars": len(text),
+                "cached": cached,
+                "seconds": time.perf_counter() - part_start
+            }
+            return audio
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(parts)))) as executor:
+            audio_parts = list(executor.map(synthesize, range(len(parts))))
+        
+        cache_hits = sum(1 for timing in timings if timing["cached"])
+        self.last_synthesis = {
+            "wall_seconds": time.perf_counter() - start,
+            "parts": timings,
+            "cache_hits": cache_hits,
+            "cache_hit_rate": cache_hits / len(parts) if parts else 0.0
+        }
+        for timing in timings:
+            source = "cached" if timing["cached"] else "synthesized"
+            print(f"Part {timing['part']}: {timing['voice']}, {timing['chars']} chars, {source} in {timing['seconds']:.2f}s")
+        print(
+            f"Synthesized {len(parts)} parts in {self.last_synthesis['wall_seconds']:.2f}s "
+            f"({sum(timing['seconds'] for timing in timings):.2f}s of synthesis), "
+            f"{cache_hits}/{len(parts)} from the clip cache"
+        )
+        return audio_parts
+
+    def assemble_audio(self, sequence: List[Union[bytes, int]], output_file: str):
+        """
+        Join MP3 clips (bytes) and pauses (milliseconds) frame by frame and
+        write the result once. Falls back to ffmpeg for clips whose frames
+        can't be joined directly.
+        """
+        start = time.perf_counter()
+        try:
+            assembler = Mp3Assembler()
+            for item in sequence:
+                if isinstance(item, int):
+                    assembler.add_silence(item)
+                else:
+                    assembler.add_clip(item)
+            assembler.write(output_file)
+            print(f"Assembled {len(sequence)} parts in {(time.perf_counter() - start) * 1000:.1f}ms")
+            return
+        except Mp3Error as e:
+            print(f"Can't join MP3 frames ({str(e)}), falling back to ffmpeg")
+        
+        temporary_files = []
+        try:
+            audio_files = []
+            for item in sequence:
+                if isinstance(item, int):
+                    audio_files.append(self.generate_silence(item))
+                    continue
+                with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
+                    temp_file.write(item)
+                temporary_files.append(temp_file.name)
+                audio_files.append(temp_file.name)
+            if not self.combine_audio_files(audio_files, output_file):
+                raise Exception("Failed to combine audio files")
+        finally:
+            for audio_file in temporary_files:
+                if os.path.exists(audio_file):
+                    os.unlink(audio_file)
 
     def combine_audio_files(self, audio_files: List[str], output_file: str):
         """Combine multiple audio files using ffmpeg"""
@@ -285,15 +436,9 @@ class AudioGenerator:
                 os.unlink(output_file)
             return False
         finally:
-            # Clean up temporary files
+            # Clean up the file list; the inputs belong to the caller
             if file_list and os.path.exists(file_list):
                 os.unlink(file_list)
-            for audio_file in audio_files:
-                if os.path.exists(audio_file):
-                    try:
-                        os.unlink(audio_file)
-                    except Exception as e:
-                        print(f"Error cleaning up {audio_file}: {str(e)}")
 
     def generate_silence(self, duration_ms: int) -> str:
         """Generate a silent audio file of specified duration"""
@@ -313,51 +458,56 @@ class AudioGenerator:
         Returns the path to the generated audio file.
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = os.path.join(self.audio_dir, f"question_{timestamp}.mp3")
+        # The question pool and the sessions share audio_dir and can finish in
+        # the same second, so the timestamp alone isn't unique
+        output_file = os.path.join(self.audio_dir, f"question_{timestamp}_{uuid.uuid4().hex}.mp3")
         
         try:
             # Parse conversation into parts
             parts = self.parse_conversation(question)
             
-            # Generate audio for each part
-            audio_parts = []
+            # Lay out the audio: pauses in milliseconds, and the index of each part to synthesize
+            sequence = []
+            speech_parts = []
             current_section = None
             
-            # Generate silence files for pauses
-            long_pause = self.generate_silence(2000)  # 2 second pause
-            short_pause = self.generate_silence(500)  # 0.5 second pause
+            long_pause = ('pause', 2000)  # 2 second pause
+            short_pause = ('pause', 500)  # 0.5 second pause
             
             for speaker, text, gender in parts:
                 # Detect section changes and add appropriate pauses
                 if speaker.lower() == 'announcer':
                     if '次の会話' in text:  # Introduction
                         if current_section is not None:
-                            audio_parts.append(long_pause)
+                            sequence.append(long_pause)
                         current_section = 'intro'
                     elif '質問' in text or '選択肢' in text:  # Question or options
-                        audio_parts.append(long_pause)
+                        sequence.append(long_pause)
                         current_section = 'question'
                 elif current_section == 'intro':
-                    audio_parts.append(long_pause)
+                    sequence.append(long_pause)
                     current_section = 'conversation'
                 
                 # Get appropriate voice for this speaker
                 voice = self.get_voice_for_gender(gender)
                 print(f"Using voice {voice} for {speaker} ({gender})")
                 
-                # Generate audio for this part
-                audio_file = self.generate_audio_part(text, voice)
-                if not audio_file:
-                    raise Exception("Failed to generate audio part")
-                audio_parts.append(audio_file)
+                # Synthesized below, together with the other parts
+                sequence.append(('speech', len(speech_parts)))
+                speech_parts.append((text, voice))
                 
                 # Add short pause between conversation turns
                 if current_section == 'conversation':
-                    audio_parts.append(short_pause)
+                    sequence.append(short_pause)
+            
+            # Synthesize the spoken parts concurrently, keeping their order
+            spoken_audio = self.synthesize_parts(speech_parts)
             
             # Combine all parts into final audio
-            if not self.combine_audio_files(audio_parts, output_file):
-                raise Exception("Failed to combine audio files")
+            self.assemble_audio(
+                [spoken_audio[value] if kind == 'speech' else value for kind, value in sequence],
+                output_file
+            )
             
             return output_file
             
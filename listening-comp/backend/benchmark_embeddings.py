@@ -0,0 +1,56 @@
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.fakes import FakeBedrockRuntime
+from backend.vector_store import AdaptiveRateLimiter, BedrockEmbeddingFunction
+
+# Compares serial and concurrent embedding throughput. Uses a local stand-in
+# for Bedrock by default so it costs nothing; pass --live to call the real API.
+
+def sample_texts(count: int):
+    return [
+        f"Situation: 駅で男の人と女の人が話しています。 Question: {i}番のバスは何時に来ますか。"
+        for i in range(count)
+    ]
+
+def run(label: str, embedding_fn: BedrockEmbeddingFunction, texts):
+    start = time.perf_counter()
+    embeddings = embedding_fn(texts)
+    elapsed = time.perf_counter() - start
+    assert len(embeddings) == len(texts)
+    print(
+        f"{label:<14} {len(texts) / elapsed:8.1f} texts/s  {elapsed:6.2f}s  "
+        f"requests={embedding_fn.stats['requests']} throttled={embedding_fn.stats['throttled']} "
+        f"retries={embedding_fn.stats['retries']}"
+    )
+    # Chroma may hand back numpy arrays, compare plain lists
+    return [list(embedding) for embedding in embeddings]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding throughput")
+    parser.add_argument("--texts", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per request")
+    parser.add_argument("--max-rps", type=float, default=100, help="Simulated service rate limit")
+    parser.add_argument("--live", action="store_true", help="Call Bedrock instead of the local stand-in")
+    args = parser.parse_args()
+
+    texts = sample_texts(args.texts)
+    results = []
+    for label, workers in [("serial", 1), (f"{args.workers} workers", args.workers)]:
+        client = None if args.live else FakeBedrockRuntime(latency=args.latency, max_rps=args.max_rps)
+        embedding_fn = BedrockEmbeddingFunction(
+            client=client,
+            max_workers=workers,
+            rate_limiter=AdaptiveRateLimiter(rate=args.max_rps * 2, max_rate=args.max_rps * 2)
+        )
+        results.append(run(label, embedding_fn, texts))
+
+    # Concurrency must not change the output or its order
+    print("Identical results:", results[0] == results[1])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import sys
+import os
+import argparse
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from backend.local_embeddings import HashingEmbeddingFunction
+from backend.vector_store import BedrockEmbeddingFunction, QuestionVectorStore, question_document
+
+# Compares the local CPU embeddings with Titan on the bundled question files.
+# Quality is self-retrieval: each question is searched for with part of its own
+# text (the dialogue for section 2, the situation for section 3) and should
+# come back first among all questions of its section.
+
+QUESTION_FILES = [
+    ("backend/data/questions/sY7L5cfCWno_section2.txt", 2, "Conversation"),
+    ("backend/data/questions/sY7L5cfCWno_section3.txt", 3, "Situation"),
+]
+
+def load_cases(store: QuestionVectorStore):
+    cases = []
+    for filename, section_num, query_field in QUESTION_FILES:
+        questions = store.parse_questions_from_file(filename)
+        documents = [question_document(section_num, question) for question in questions]
+        queries = [question[query_field] for question in questions]
+        cases.append((section_num, documents, queries))
+    return cases
+
+def evaluate(name: str, embedding_fn, cases):
+    recall_at_1 = []
+    reciprocal_ranks = []
+    texts = 0
+    elapsed = 0.0
+    for section_num, documents, queries in cases:
+        start = time.perf_counter()
+        document_vectors = np.array(embedding_fn(documents), dtype=np.float32)
+        query_vectors = np.array(embedding_fn(queries), dtype=np.float32)
+        elapsed += time.perf_counter() - start
+        texts += len(documents) + len(queries)
+
+        document_vectors /= np.linalg.norm(document_vectors, axis=1, keepdims=True)
+        query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+        scores = query_vectors @ document_vectors.T
+        for idx, row in enumerate(scores):
+            rank = int((row > row[idx]).sum()) + 1
+            recall_at_1.append(rank == 1)
+            reciprocal_ranks.append(1.0 / rank)
+
+    print(
+        f"{name:<8} recall@1={np.mean(recall_at_1):.2f}  MRR={np.mean(reciprocal_ranks):.2f}  "
+        f"{1000 * elapsed / texts:7.2f} ms/text  ({len(recall_at_1)} queries)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local embeddings against Titan")
+    parser.add_argument("--live", action="store_true", help="Also evaluate Titan embeddings on Bedrock")
+    args = parser.parse_args()
+
+    store = QuestionVectorStore(tempfile.mkdtemp(), embedding_backend="local")
+    cases = load_cases(store)
+    evaluate("local", HashingEmbeddingFunction(), cases)
+    if args.live:
+        # No cache, so latency reflects real model calls
+        evaluate("titan", BedrockEmbeddingFunction(), cases)
+    else:
+        print("titan    skipped (pass --live to call Bedrock)")
+
+if __name__ == "__main__":
+    main()
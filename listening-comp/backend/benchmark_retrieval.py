@@ -0,0 +1,92 @@
+import sys
+import os
+import argparse
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from backend.vector_store import QuestionVectorStore
+
+# Compares vector, keyword (BM25) and hybrid retrieval on the bundled question
+# files. Each query describes one question, partly in its own vocabulary and
+# partly paraphrased, and that question should come back among the top k.
+# --copies indexes extra copies of the questions under other video ids, to
+# measure latency on a larger index; searches are then prefiltered to the
+# original video so recall stays comparable.
+
+VIDEO_ID = "sY7L5cfCWno"
+QUESTION_FILES = [
+    (f"backend/data/questions/{VIDEO_ID}_section2.txt", 2),
+    (f"backend/data/questions/{VIDEO_ID}_section3.txt", 3),
+]
+
+# (section, query, position of the expected question in its file)
+CASES = [
+    (2, "誕生日のプレゼントの花", 0),
+    (2, "昼ご飯を外で食べる学生", 1),
+    (2, "レストランで鶏肉の料理を注文する", 2),
+    (2, "クラスのパーティーに来る先生の人数", 3),
+    (2, "映画に誘われたが病院と郵便局へ行く", 4),
+    (2, "パーティーで温かい飲み物を頼む", 5),
+    (3, "寝る前のあいさつ", 0),
+    (3, "出かける時に家族に言う言葉", 1),
+    (3, "東京まで電車で何分かかるか聞く", 2),
+    (3, "タクシーで行き先を伝える", 3),
+    (3, "喫茶店でコーヒーを注文する", 4),
+]
+
+def build_store(args) -> QuestionVectorStore:
+    store = QuestionVectorStore(
+        tempfile.mkdtemp(), embedding_backend=args.embedding_backend, index_backend=args.index_backend
+    )
+    for filename, section_num in QUESTION_FILES:
+        questions = store.parse_questions_from_file(filename)
+        store.add_questions(section_num, questions, VIDEO_ID)
+        for copy in range(args.copies):
+            store.add_questions(section_num, questions, f"copy{copy:04d}")
+    return store
+
+def evaluate(store: QuestionVectorStore, mode: str, k: int, where):
+    questions = {
+        section_num: store.parse_questions_from_file(filename) for filename, section_num in QUESTION_FILES
+    }
+    hits = []
+    reciprocal_ranks = []
+    latencies = []
+    for section_num, query, position in CASES:
+        expected = questions[section_num][position]
+        start = time.perf_counter()
+        results = store.search_similar_questions(section_num, query, n_results=k, where=where, mode=mode)
+        latencies.append(time.perf_counter() - start)
+        rank = next((i + 1 for i, result in enumerate(results) if all(
+            result.get(field) == value for field, value in expected.items()
+        )), None)
+        hits.append(rank is not None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+    print(
+        f"{mode:<8} recall@{k}={np.mean(hits):.2f}  MRR={np.mean(reciprocal_ranks):.2f}  "
+        f"p50={1000 * np.percentile(latencies, 50):6.2f} ms  p95={1000 * np.percentile(latencies, 95):6.2f} ms  "
+        f"({len(hits)} queries)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector, keyword and hybrid question retrieval")
+    parser.add_argument("--k", type=int, default=1)
+    parser.add_argument("--copies", type=int, default=0, help="Extra copies of the questions to index")
+    parser.add_argument("--embedding-backend", default="local", choices=["local", "bedrock"])
+    parser.add_argument("--index-backend", default="numpy", choices=["chroma", "numpy"])
+    args = parser.parse_args()
+
+    store = build_store(args)
+    where = {"video_id": VIDEO_ID} if args.copies else None
+    print(f"{store.collections['section2'].count() + store.collections['section3'].count()} questions indexed")
+    for mode in ["vector", "keyword", "hybrid"]:
+        # Warm up, so the keyword index build isn't counted as query latency
+        store.search_similar_questions(2, "warmup", mode=mode)
+        store.search_similar_questions(3, "warmup", mode=mode)
+        evaluate(store, mode, args.k, where)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.audio_generator import AudioGenerator
+from backend.fakes import FakeBedrockRuntime, FakePolly
+
+# Compares serial and concurrent synthesis of a dialogue's parts against a
+# local stand-in for Polly, checking that the parts come back in order.
+
+DIALOGUE = [
+    ("次の会話を聞いて、質問に答えてください。", "Takumi"),
+    ("すみません、この電車は新宿駅に止まりますか。", "Takumi"),
+    ("はい、次の駅が新宿です。", "Kazuha"),
+    ("ありがとうございます。何分くらいかかりますか。", "Takumi"),
+    ("そうですね、5分くらいです。", "Kazuha"),
+    ("新宿で乗り換えたいんですが。", "Takumi"),
+    ("中央線なら3番線ですよ。", "Kazuha"),
+    ("わかりました。助かります。", "Takumi"),
+    ("どういたしまして。", "Kazuha"),
+    ("男の人は何番線に行きますか。", "Takumi"),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TTS synthesis of dialogue parts")
+    parser.add_argument("--latency", type=float, default=0.3, help="Simulated seconds per Polly call")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for workers in [1, args.workers]:
+        generator = AudioGenerator(
+            polly_client=FakePolly(latency=args.latency),
+            bedrock_client=FakeBedrockRuntime(),
+            max_workers=workers,
+            # Measure synthesis itself, not the clip cache
+            clip_cache=False
+        )
+        audio_parts = generator.synthesize_parts(DIALOGUE)
+        in_order = [
+            audio == f"[{voice}] {text}\n".encode("utf-8")
+            for (text, voice), audio in zip(DIALOGUE, audio_parts)
+        ]
+        synthesis = generator.last_synthesis
+        print(
+            f"== {workers} worker(s): {synthesis['wall_seconds']:.2f}s wall for {len(DIALOGUE)} parts, "
+            f"in order: {all(in_order)}\n"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import sys
+import os
+import argparse
+import random
+import subprocess
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.vector_store import QuestionVectorStore
+
+# Compares the Chroma and NumPy index backends on a synthetic corpus built from
+# the bundled questions, using local embeddings so no AWS calls are made.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OPEN_SCRIPT = """
+import sys, time
+sys.path.append({root!r})
+from backend.vector_store import QuestionVectorStore
+start = time.perf_counter()
+store = QuestionVectorStore({directory!r}, embedding_backend="local", index_backend={backend!r})
+store.collections["section2"].count()
+print(time.perf_counter() - start)
+"""
+
+def synthetic_questions(store: QuestionVectorStore, count: int):
+    questions = store.parse_questions_from_file("backend/data/questions/sY7L5cfCWno_section2.txt")
+    lines = [line for question in questions for line in (question['Conversation'], question['Question'])]
+    rng = random.Random(0)
+    return [
+        {
+            "Introduction": rng.choice(questions)['Introduction'],
+            "Conversation": "".join(rng.sample(lines, 3)),
+            "Question": rng.choice(lines),
+            "Options": [],
+        }
+        for _ in range(count)
+    ]
+
+def open_time(directory: str, backend: str) -> float:
+    """Seconds to open the store in a fresh process, excluding imports"""
+    output = subprocess.run(
+        [sys.executable, "-c", OPEN_SCRIPT.format(root=ROOT, directory=directory, backend=backend)],
+        capture_output=True, text=True, check=True, cwd=ROOT
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector index backends")
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    for backend in ["chroma", "numpy"]:
+        directory = os.path.join(workdir, backend)
+        store = QuestionVectorStore(directory, embedding_backend="local", index_backend=backend)
+        questions = synthetic_questions(store, args.questions)
+
+        start = time.perf_counter()
+        for chunk in range(0, len(questions), 1000):
+            store.add_questions(2, questions[chunk:chunk + 1000], f"video{chunk // 1000}")
+        build = time.perf_counter() - start
+
+        queries = [question['Question'] for question in questions[:args.queries]]
+        start = time.perf_counter()
+        for query in queries:
+            store.search_similar_questions(2, query, mode="vector")
+        single = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        for chunk in range(0, len(queries), args.batch):
+            store.search_similar_questions_batch(2, queries[chunk:chunk + args.batch], mode="vector")
+        batched = (time.perf_counter() - start) / len(queries)
+
+        print(
+            f"{backend:<7} build={build:6.2f}s  open={1000 * open_time(directory, backend):7.1f}ms  "
+            f"query={1000 * single:6.2f}ms  batched={1000 * batched:6.2f}ms/query"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import math
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+def tokenize(text: str) -> List[str]:
+    """
+    Character bigrams of each run of letters, so Japanese needs no word
+    segmentation; runs of a single character are kept as unigrams.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    # Whitespace and punctuation split runs
+    text = "".join(" " if unicodedata.category(c)[0] in "PZ" else c for c in text)
+    tokens = []
+    for run in text.split():
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+def matches(metadata: Optional[Dict], where: Optional[Dict]) -> bool:
+    """Equality on top-level metadata keys; a list value matches any of its items"""
+    if not where:
+        return True
+    if metadata is None:
+        return False
+    for key, value in where.items():
+        if isinstance(value, (list, tuple, set)):
+            if metadata.get(key) not in value:
+                return False
+        elif metadata.get(key) != value:
+            return False
+    return True
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 over character bigrams.
+
+    Postings are kept as NumPy arrays, so a query costs one vectorized update
+    per query token rather than a Python loop over every matching document;
+    at 5k questions a search takes well under a millisecond.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.numbers = {}  # id -> document number
+        self.metadatas = []
+        self.lengths = []
+        self.postings = {}  # token -> ([document numbers], [term frequencies])
+        self.arrays = None  # token -> (document numbers, term frequencies), built on first search
+        self.masks = {}  # where filter -> matching documents
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict]] = None):
+        metadatas = metadatas or [None] * len(ids)
+        for id, document, metadata in zip(ids, documents, metadatas):
+            number = len(self.ids)
+            counts = Counter(tokenize(document))
+            for token, frequency in counts.items():
+                numbers, frequencies = self.postings.setdefault(token, ([], []))
+                numbers.append(number)
+                frequencies.append(frequency)
+            self.ids.append(id)
+            self.numbers[id] = number
+            self.metadatas.append(metadata)
+            self.lengths.append(sum(counts.values()))
+        self.arrays = None
+        self.masks = {}
+
+    def _build(self):
+        lengths = np.array(self.lengths, dtype=np.float32)
+        average_length = lengths.mean() or 1.0
+        # The length normalization only depends on the document
+        self.norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        # Set last: searches in other threads use the arrays once they're there
+        self.arrays = {
+            token: (np.array(numbers, dtype=np.int64), np.array(frequencies, dtype=np.float32))
+            for token, (numbers, frequencies) in self.postings.items()
+        }
+
+    def _mask(self, where: Dict) -> np.ndarray:
+        key = repr(sorted((key, sorted(value) if isinstance(value, (list, tuple, set)) else value) for key, value in where.items()))
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = np.array([matches(metadata, where) for metadata in self.metadatas], dtype=bool)
+            self.masks[key] = mask
+        return mask
+
+    def search(self, query: str, n_results: int = 10, where: Optional[Dict] = None) -> List[Tuple[str, float]]:
+        """(id, score) of the best matching documents, best first; documents without a shared token are left out"""
+        if not self.ids:
+            return []
+        if self.arrays is None:
+            self._build()
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for token in set(tokenize(query)):
+            posting = self.arrays.get(token)
+            if posting is None:
+                continue
+            numbers, frequencies = posting
+            # The "+ 1" form keeps idf positive for tokens in most documents
+            idf = math.log(1 + (len(self.ids) - len(numbers) + 0.5) / (len(numbers) + 0.5))
+            # A token occurs once per posting list, so there are no repeated indices
+            scores[numbers] += idf * frequencies * (self.k1 + 1) / (frequencies + self.norms[numbers])
+        if where:
+            scores[~self._mask(where)] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > n_results:
+            candidates = candidates[np.argpartition(-scores[candidates], n_results - 1)[:n_results]]
+        # Ties keep document order
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(self.ids[number], float(scores[number])) for number in ranked]
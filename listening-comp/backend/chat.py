@@ -3,6 +3,11 @@
 import boto3
 import streamlit as st
 from typing import Optional, Dict, Any
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.llm_cache import CachedConverseClient
 
 
 # Model ID
@@ -13,7 +18,8 @@ MODEL_ID = "amazon.nova-micro-v1:0"
 class BedrockChat:
     def __init__(self, model_id: str = MODEL_ID):
         """Initialize Bedrock chat client"""
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name="us-east-1")
+        # Only temperature 0 requests are served from the response cache
+        self.bedrock_client = CachedConverseClient(boto3.client('bedrock-runtime', region_name="us-east-1"))
         self.model_id = model_id
 
     def generate_response(self, message: str, inference_config: Optional[Dict[str, Any]] = None) -> Optional[str]:
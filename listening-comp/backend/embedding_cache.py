@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, List, Optional
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so cosmetic differences share an entry"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def cache_key(model_id: str, text: str) -> str:
+    return hashlib.sha256(f"{model_id}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model id, normalized text hash).
+
+    Vectors are stored as float32 blobs in SQLite. When the stored vectors grow
+    past max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = "backend/data/embedding_cache.sqlite3", max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model_id TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model_id: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vectors for texts, in order, with None for each miss"""
+        keys = [cache_key(model_id, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        unique = list(set(keys))
+        with self.lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, blob in self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ):
+                    found[key] = array("f", blob).tolist()
+            if found:
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(time.time(), key) for key in found]
+                )
+                self.conn.commit()
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for result in results if result is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model_id: str, texts: List[str], embeddings: List[List[float]]) -> List[List[float]]:
+        """
+        Store vectors for texts, then evict if the cache is over its size limit.
+        Returns the vectors as stored (float32), matching what later hits return.
+        """
+        now = time.time()
+        entries = [
+            (cache_key(model_id, text), array("f", embedding).tobytes())
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self.lock:
+            for key, blob in entries:
+                previous = self.conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model_id, vector, last_used) VALUES (?, ?, ?, ?)",
+                    (key, model_id, blob, now)
+                )
+                self.size += len(blob) - (previous[0] if previous else 0)
+            self.conn.commit()
+            if self.size > self.max_bytes:
+                self._evict()
+        return [array("f", blob).tolist() for _, blob in entries]
+
+    def _evict(self):
+        # Trim to 90% of the limit so eviction doesn't run on every insert
+        target = self.max_bytes * 0.9
+        cursor = self.conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used")
+        doomed = []
+        for key, size in cursor:
+            if self.size <= target:
+                break
+            doomed.append((key,))
+            self.size -= size
+        self.conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        self.conn.commit()
+        self.evictions += len(doomed)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self.size,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM embeddings")
+            self.conn.commit()
+            self.size = 0
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,144 @@
+"""
+Local stand-ins for AWS clients, for benchmarks and offline development.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+
+def _throttling_error(operation: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+        operation
+    )
+
+
+class FakeBedrockRuntime:
+    """
+    Mimics the bedrock-runtime invoke_model call for Titan text embeddings,
+    and converse with replies produced by `responder`.
+
+    Each call sleeps for `latency` seconds and returns a deterministic vector
+    derived from the text. Calls beyond `max_rps` within a one second window
+    raise a ThrottlingException like the real service.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        max_rps: Optional[float] = None,
+        dimensions: int = 1536,
+        responder: Optional[Callable[[str], str]] = None,
+    ):
+        self.latency = latency
+        # Maps a converse prompt to the reply text
+        self.responder = responder or (lambda prompt: "")
+        self.max_rps = max_rps
+        self.dimensions = dimensions
+        self.calls = 0
+        self.throttled = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def _admit(self) -> bool:
+        if self.max_rps is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.max_rps:
+                self.throttled += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def embedding(self, text: str):
+        seed = hashlib.sha256(text.encode("utf-8")).digest()
+        return [((seed[i % len(seed)] + i) % 251) / 125.0 - 1.0 for i in range(self.dimensions)]
+
+    def invoke_model(self, modelId: str, body: str, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if not self._admit():
+            raise _throttling_error("InvokeModel")
+        time.sleep(self.latency)
+        text = json.loads(body)["inputText"]
+        payload = json.dumps({"embedding": self.embedding(text), "inputTextTokenCount": len(text)})
+        return {"body": io.BytesIO(payload.encode("utf-8"))}
+
+    def converse(self, modelId: str, messages: List[Dict], **kwargs):
+        with self._lock:
+            self.calls += 1
+        if not self._admit():
+            raise _throttling_error("Converse")
+        time.sleep(self.latency)
+        prompt = messages[-1]["content"][0]["text"]
+        return {"output": {"message": {"role": "assistant", "content": [{"text": self.responder(prompt)}]}}}
+
+    def converse_stream(self, modelId: str, messages: List[Dict], chunk_size: int = 8, **kwargs):
+        """Like converse, but the reply arrives in small text deltas spread over `latency`"""
+        with self._lock:
+            self.calls += 1
+        if not self._admit():
+            raise _throttling_error("ConverseStream")
+        text = self.responder(messages[-1]["content"][0]["text"])
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)] or [""]
+
+        def events():
+            yield {"messageStart": {"role": "assistant"}}
+            for chunk in chunks:
+                time.sleep(self.latency / len(chunks))
+                yield {"contentBlockDelta": {"delta": {"text": chunk}, "contentBlockIndex": 0}}
+            yield {"contentBlockStop": {"contentBlockIndex": 0}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+
+        return {"stream": events()}
+
+class FakeTranscriptDownloader:
+    """Stands in for YouTubeTranscriptDownloader, returning the same transcript for every video"""
+
+    def __init__(self, transcript_file: str, latency: float = 0.1):
+        with open(transcript_file, 'r', encoding='utf-8') as f:
+            self.lines = [line.rstrip("\n") for line in f]
+        self.latency = latency
+
+    def get_transcript(self, video_id: str) -> Optional[List[Dict]]:
+        time.sleep(self.latency)
+        return [{"text": line} for line in self.lines]
+
+    def save_transcript(self, transcript: List[Dict], filename: str, directory: str = "./transcripts") -> bool:
+        with open(os.path.join(directory, f"{filename}.txt"), 'w', encoding='utf-8') as f:
+            for entry in transcript:
+                f.write(f"{entry['text']}\n")
+        return True
+
+class FakePolly:
+    """
+    Stands in for the Polly client's synthesize_speech. Returns a small fake
+    MP3 payload naming the voice and text after `latency` seconds, or real
+    audio from `audio_factory(text, voice)` when one is given.
+    """
+
+    def __init__(self, latency: float = 0.3, audio_factory: Optional[Callable[[str, str], bytes]] = None):
+        self.latency = latency
+        self.audio_factory = audio_factory
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize_speech(self, Text: str, VoiceId: str, OutputFormat: str = "mp3", **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if self.audio_factory is not None:
+            audio = self.audio_factory(Text, VoiceId)
+        else:
+            audio = f"[{VoiceId}] {Text}\n".encode("utf-8")
+        return {"AudioStream": io.BytesIO(audio), "ContentType": "audio/mpeg"}
@@ -1,4 +1,5 @@
 from youtube_transcript_api import YouTubeTranscriptApi
+import os
 from typing import Optional, List, Dict
 
 
@@ -48,18 +49,19 @@ class YouTubeTranscriptDownloader:
             print(f"An error occurred: {str(e)}")
             return None
 
-    def save_transcript(self, transcript: List[Dict], filename: str) -> bool:
+    def save_transcript(self, transcript: List[Dict], filename: str, directory: str = "./transcripts") -> bool:
         """
         Save transcript to file
         
         Args:
             transcript (List[Dict]): Transcript data
             filename (str): Output filename
+            directory (str): Directory to save into
             
         Returns:
             bool: True if successful, False otherwise
         """
-        filename = f"./transcripts/{filename}.txt"
+        filename = os.path.join(directory, f"{filename}.txt")
         
         try:
             with open(filename, 'w', encoding='utf-8') as f:
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "backend/data/llm_cache.sqlite3")
+
+class LLMCache:
+    """
+    Disk-backed cache of Bedrock converse responses, keyed by a hash of
+    (model id, messages, inference config).
+
+    Entries expire after ttl seconds, and the least recently used ones are
+    evicted once the stored responses grow past max_bytes.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 7 * 24 * 3600, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model_id TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COALESCE(SUM(LENGTH(response)), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(model_id: str, messages: List[Dict], inference_config: Optional[Dict]) -> str:
+        payload = json.dumps(
+            {"model": model_id, "messages": messages, "inferenceConfig": inference_config or {}},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.conn.commit()
+                self.size -= len(row[0])
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, model_id: str, response: Dict):
+        data = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self.lock:
+            previous = self.conn.execute("SELECT LENGTH(response) FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model_id, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model_id, data, now, now)
+            )
+            self.size += len(data) - (previous[0] if previous else 0)
+            self.conn.commit()
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Expired entries go first, then the least recently used down to 90% of the limit
+        cutoff = time.time() - self.ttl
+        expired = self.conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+        self.size = self.conn.execute("SELECT COALESCE(SUM(LENGTH(response)), 0) FROM responses").fetchone()[0]
+        target = self.max_bytes * 0.9
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, LENGTH(response) FROM responses ORDER BY last_used"):
+            if self.size <= target:
+                break
+            doomed.append((key,))
+            self.size -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.conn.commit()
+        self.evictions += expired + len(doomed)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self.size,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self.size = 0
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache() -> LLMCache:
+    """The cache shared by every Bedrock client in the process"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
+
+class CachedConverseClient:
+    """
+    Wraps a bedrock-runtime client so converse() answers repeated requests
+    from the cache. Sampled requests (temperature > 0) are meant to vary, so
+    they bypass the cache unless allow_sampling is set. Everything else is
+    passed through to the wrapped client.
+    """
+
+    def __init__(self, client, cache: Optional[LLMCache] = None, allow_sampling: bool = False):
+        self.client = client
+        self.cache = cache or get_default_cache()
+        self.allow_sampling = allow_sampling
+
+    def converse(self, modelId: str, messages: List[Dict], inferenceConfig: Optional[Dict] = None, **kwargs):
+        temperature = (inferenceConfig or {}).get("temperature", 0)
+        if kwargs or (temperature > 0 and not self.allow_sampling):
+            with self.cache.lock:
+                self.cache.bypassed += 1
+            return self._converse(modelId, messages, inferenceConfig, **kwargs)
+
+        key = self.cache.key(modelId, messages, inferenceConfig)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = self._converse(modelId, messages, inferenceConfig)
+        # Truncated or filtered replies aren't worth keeping
+        if response.get("stopReason", "end_turn") == "end_turn":
+            self.cache.put(key, modelId, {
+                "output": response["output"],
+                "stopReason": response.get("stopReason", "end_turn"),
+                "usage": response.get("usage", {}),
+            })
+        return response
+
+    def _converse(self, modelId: str, messages: List[Dict], inferenceConfig: Optional[Dict], **kwargs):
+        if inferenceConfig is None:
+            return self.client.converse(modelId=modelId, messages=messages, **kwargs)
+        return self.client.converse(modelId=modelId, messages=messages, inferenceConfig=inferenceConfig, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
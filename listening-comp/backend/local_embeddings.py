@@ -0,0 +1,41 @@
+import unicodedata
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+from chromadb.utils import embedding_functions
+
+class HashingEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    """
+    Embeds text on the CPU by hashing character n-grams into a fixed-size vector.
+
+    Character n-grams work for Japanese without a tokenizer. Each n-gram is
+    hashed with CRC32 (stable across processes, unlike hash()) to a bucket and
+    a sign; counts are log-scaled and the vector L2-normalized.
+    """
+
+    def __init__(self, dimensions: int = 1024, ngram_range: Tuple[int, int] = (1, 3)):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.model_id = f"char-ngram-hash-{dimensions}-{ngram_range[0]}-{ngram_range[1]}"
+
+    def _ngrams(self, text: str) -> List[str]:
+        # Spaces carry no meaning in Japanese text and only add noise
+        text = "".join(unicodedata.normalize("NFKC", text).lower().split())
+        low, high = self.ngram_range
+        return [text[i:i + n] for n in range(low, high + 1) for i in range(len(text) - n + 1)]
+
+    def embed_text(self, text: str) -> np.ndarray:
+        hashes = np.array([zlib.crc32(gram.encode("utf-8")) for gram in self._ngrams(text)], dtype=np.uint32)
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        if len(hashes) == 0:
+            return vector
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vector += np.bincount(hashes % self.dimensions, weights=signs, minlength=self.dimensions)
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of texts locally"""
+        return [self.embed_text(text).tolist() for text in texts]
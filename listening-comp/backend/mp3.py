@@ -0,0 +1,165 @@
+"""
+Minimal MPEG audio (Layer III) frame handling, enough to join MP3 clips and
+insert silence without decoding or re-encoding.
+"""
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+class Mp3Error(Exception):
+    """Raised when data can't be handled as Layer III frames"""
+
+# Bitrates in kbps by bitrate index, for Layer III
+BITRATES = {
+    "1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {
+    "1": [44100, 48000, 32000],
+    "2": [22050, 24000, 16000],
+    "2.5": [11025, 12000, 8000],
+}
+VERSION_BITS = {0b11: "1", 0b10: "2", 0b00: "2.5"}
+
+class FrameFormat(NamedTuple):
+    version: str
+    sample_rate_index: int
+    mono: bool
+
+    @property
+    def sample_rate(self) -> int:
+        return SAMPLE_RATES[self.version][self.sample_rate_index]
+
+    @property
+    def samples_per_frame(self) -> int:
+        return 1152 if self.version == "1" else 576
+
+    @property
+    def side_info_size(self) -> int:
+        if self.version == "1":
+            return 17 if self.mono else 32
+        return 9 if self.mono else 17
+
+class Frame(NamedTuple):
+    format: FrameFormat
+    data: bytes
+
+def _parse_header(data: bytes, offset: int) -> Optional[Tuple[FrameFormat, int]]:
+    """Format and length of the frame starting at offset, None if there's no valid header"""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version = VERSION_BITS.get((data[offset + 1] >> 3) & 0b11)
+    layer = (data[offset + 1] >> 1) & 0b11
+    bitrate_index = data[offset + 2] >> 4
+    sample_rate_index = (data[offset + 2] >> 2) & 0b11
+    padding = (data[offset + 2] >> 1) & 1
+    mono = data[offset + 3] >> 6 == 0b11
+    if version is None or layer != 0b01 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    frame_format = FrameFormat(version, sample_rate_index, mono)
+    bitrate = BITRATES["1" if version == "1" else "2"][bitrate_index] * 1000
+    coefficient = 144 if version == "1" else 72
+    return frame_format, coefficient * bitrate // frame_format.sample_rate + padding
+
+def _id3v2_size(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    # Sizes are "syncsafe": 7 bits per byte
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _is_info_frame(frame: Frame) -> bool:
+    """Xing/Info/VBRI header frames describe a whole file and would be wrong mid-stream"""
+    start = 4 + frame.format.side_info_size
+    return frame.data[start:start + 4] in (b"Xing", b"Info") or frame.data[36:40] == b"VBRI"
+
+def parse_frames(data: bytes) -> List[Frame]:
+    """Audio frames of an MP3 file, without ID3 tags or Xing/Info/VBRI header frames"""
+    end = len(data)
+    if end >= 128 and data[-128:-125] == b"TAG":
+        end -= 128
+    offset = _id3v2_size(data)
+    frames = []
+    while offset < end:
+        header = _parse_header(data, offset)
+        if header is None or offset + header[1] > end:
+            # Resync on the next frame header, skipping junk between frames
+            next_offset = data.find(b"\xff", offset + 1, end)
+            if next_offset == -1:
+                break
+            offset = next_offset
+            continue
+        frame_format, length = header
+        frame = Frame(frame_format, data[offset:offset + length])
+        # Only the first frame can be an info frame
+        if frames or not _is_info_frame(frame):
+            frames.append(frame)
+        offset += length
+    if not frames:
+        raise Mp3Error("No MPEG Layer III frames found")
+    return frames
+
+def silent_frame(frame_format: FrameFormat) -> bytes:
+    """
+    One frame of silence at the lowest bitrate: a header, all-zero side info
+    (no main data, so it decodes to zeros) and zero padding.
+    """
+    version_bits = {"1": 0b11, "2": 0b10, "2.5": 0b00}[frame_format.version]
+    header = bytes([
+        0xFF,
+        0xE0 | (version_bits << 3) | (0b01 << 1) | 1,  # Layer III, no CRC
+        (1 << 4) | (frame_format.sample_rate_index << 2),  # Bitrate index 1, no padding
+        0xC0 if frame_format.mono else 0x00,
+    ])
+    bitrate = BITRATES["1" if frame_format.version == "1" else "2"][1] * 1000
+    coefficient = 144 if frame_format.version == "1" else 72
+    length = coefficient * bitrate // frame_format.sample_rate
+    return header + bytes(length - len(header))
+
+def silence(duration_ms: int, frame_format: FrameFormat) -> bytes:
+    frames = round(duration_ms / 1000 * frame_format.sample_rate / frame_format.samples_per_frame)
+    return silent_frame(frame_format) * frames
+
+# Polly's MP3 output at SampleRate 24000: MPEG-2 Layer III, mono
+POLLY_FORMAT = FrameFormat("2", 1, True)
+
+class Mp3Assembler:
+    """
+    Joins MP3 clips and silences frame by frame. All clips must share one
+    sample rate and channel layout; silences use the clips' format.
+    """
+
+    def __init__(self, default_format: FrameFormat = POLLY_FORMAT):
+        self.default_format = default_format
+        self.format = None
+        self.parts = []  # frame bytes, or a silence duration in ms
+
+    def add_clip(self, data: bytes):
+        frames = parse_frames(data)
+        for frame in frames:
+            if self.format is None:
+                self.format = frame.format
+            elif (frame.format.sample_rate, frame.format.mono) != (self.format.sample_rate, self.format.mono):
+                raise Mp3Error(
+                    f"Clip format {frame.format.sample_rate} Hz mono={frame.format.mono} doesn't match "
+                    f"{self.format.sample_rate} Hz mono={self.format.mono}"
+                )
+        self.parts.append(b"".join(frame.data for frame in frames))
+
+    def add_silence(self, duration_ms: int):
+        self.parts.append(duration_ms)
+
+    def getvalue(self) -> bytes:
+        frame_format = self.format or self.default_format
+        return b"".join(
+            silence(part, frame_format) if isinstance(part, int) else part
+            for part in self.parts
+        )
+
+    def write(self, output_file: str):
+        """Write the joined audio in one go"""
+        temp_path = output_file + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(self.getvalue())
+        os.replace(temp_path, output_file)
@@ -0,0 +1,408 @@
+import bisect
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DTYPES = {"float16": np.float16, "int8": np.int8}
+
+class Segment:
+    """One append-only block of vectors, memory-mapped from disk"""
+
+    def __init__(self, number: int, vectors: np.ndarray, scales: Optional[np.ndarray], live: np.ndarray):
+        self.number = number
+        self.vectors = vectors
+        self.scales = scales
+        self.live = live
+        # Segments never change once written, so they are converted for scoring once
+        self.matrix = np.asarray(vectors, dtype=np.float32)
+        if scales is not None:
+            self.matrix *= scales[:, None]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine scores of each query against every row"""
+        return queries @ self.matrix.T
+
+class NumpyCollection:
+    """
+    Vector collection backed by memory-mapped .npy segments, with the parts of
+    the chromadb Collection API that QuestionVectorStore uses.
+
+    Embeddings are L2-normalized and stored as float16, or as int8 with a
+    float32 scale per row. Each add writes a new segment; ids, documents and
+    metadata live in an SQLite side table that points at (segment, offset).
+    Deleted rows stay in their segment until compact(). Distances are squared
+    L2 like Chroma's default, which for unit vectors is 2 - 2 * cosine.
+
+    Several processes (e.g. the pipeline and the app) can share a directory:
+    segment numbers are allocated from the segments table while holding
+    SQLite's write lock, and the segment list is reloaded whenever another
+    connection has committed since it was last read.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        embedding_function=None,
+        metadata: Optional[Dict] = None,
+        dtype: str = "float16",
+    ):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype}")
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.name = os.path.basename(directory)
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(directory, "items.sqlite3"), check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS items (
+                id TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                document TEXT,
+                metadata TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_items_position ON items(segment, offset);
+            CREATE TABLE IF NOT EXISTS segments (number INTEGER PRIMARY KEY);
+        """)
+        with self.conn:
+            # Indexes written before the segments table existed
+            self.conn.execute("INSERT OR IGNORE INTO segments (number) SELECT DISTINCT segment FROM items")
+        settings = dict(self.conn.execute("SELECT key, value FROM settings"))
+        if not settings:
+            settings = {"dtype": dtype, "metadata": json.dumps(metadata or {})}
+            self.conn.executemany("INSERT INTO settings (key, value) VALUES (?, ?)", settings.items())
+            self.conn.commit()
+        # The stored dtype wins so existing segments stay readable
+        self.dtype = settings["dtype"]
+        self.metadata = json.loads(settings["metadata"])
+        self.segments: List[Segment] = []
+        self.data_version = None
+        self._refresh()
+
+    def _segment_path(self, number: int, suffix: str = "") -> str:
+        return os.path.join(self.directory, f"{number:05d}{suffix}.npy")
+
+    def _refresh(self):
+        """Reload segments and deleted rows if another connection has committed since the last load"""
+        # data_version only changes for commits made by other connections
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self.data_version:
+            self.segments = self._load_segments()
+            self.data_version = version
+
+    def _load_segments(self) -> List[Segment]:
+        live_offsets: Dict[int, List[int]] = {}
+        for segment, offset in self.conn.execute("SELECT segment, offset FROM items"):
+            live_offsets.setdefault(segment, []).append(offset)
+
+        # Segments never change once written, so the ones already mapped are kept
+        known = {segment.number: segment for segment in self.segments}
+        segments = []
+        for (number,) in self.conn.execute("SELECT number FROM segments ORDER BY number").fetchall():
+            segment = known.get(number)
+            if segment is None:
+                try:
+                    vectors = np.load(self._segment_path(number), mmap_mode="r")
+                    scales = np.load(self._segment_path(number, ".scale"), mmap_mode="r") if self.dtype == "int8" else None
+                except FileNotFoundError:
+                    # Compacted away by another process after the list was read
+                    continue
+                segment = Segment(number, vectors, scales, None)
+            live = np.zeros(len(segment.vectors), dtype=bool)
+            live[live_offsets.get(number, [])] = True
+            segment.live = live
+            segments.append(segment)
+        return segments
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if self.embedding_function is None:
+            raise ValueError("Collection has no embedding function, pass embeddings instead")
+        return np.asarray(self.embedding_function(texts), dtype=np.float32)
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+    def _write_segment(self, embeddings: np.ndarray) -> Segment:
+        """Write a new segment file; call inside a BEGIN IMMEDIATE transaction so its number is unique"""
+        number = self.conn.execute("SELECT COALESCE(MAX(number) + 1, 0) FROM segments").fetchone()[0]
+        self.conn.execute("INSERT INTO segments (number) VALUES (?)", (number,))
+        scales = None
+        if self.dtype == "int8":
+            scales = np.abs(embeddings).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            vectors = np.round(embeddings / scales[:, None]).astype(np.int8)
+            scales = scales.astype(np.float32)
+            self._save(self._segment_path(number, ".scale"), scales)
+        else:
+            vectors = embeddings.astype(np.float16)
+        self._save(self._segment_path(number), vectors)
+        segment = Segment(
+            number,
+            np.load(self._segment_path(number), mmap_mode="r"),
+            np.load(self._segment_path(number, ".scale"), mmap_mode="r") if scales is not None else None,
+            np.ones(len(vectors), dtype=bool)
+        )
+        return segment
+
+    @staticmethod
+    def _save(path: str, array: np.ndarray):
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(temp_path, path)
+
+    def _segment(self, number: int) -> Optional[Segment]:
+        for segment in self.segments:
+            if segment.number == number:
+                return segment
+        return None
+
+    def _drop_rows(self, rows):
+        for segment_number, offset in rows:
+            segment = self._segment(segment_number)
+            if segment is not None:
+                segment.live[offset] = False
+
+    def _write(self, ids: List[str], embeddings, documents, metadatas, replace: bool):
+        if len(set(ids)) != len(ids):
+            raise ValueError("Expected IDs to be unique")
+        if embeddings is None:
+            embeddings = self._embed(documents)
+        embeddings = self._normalize(embeddings)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self.lock:
+            with self.conn:
+                # Held until the commit, so other processes can't take the same segment number
+                self.conn.execute("BEGIN IMMEDIATE")
+                self._refresh()
+                existing = self._positions(ids)
+                if existing and not replace:
+                    raise ValueError(f"IDs already exist: {', '.join(sorted(existing))}")
+                # Vectors first: a crash before the commit leaves an unreferenced file, not a dangling row
+                segment = self._write_segment(embeddings)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO items (id, segment, offset, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (id, segment.number, offset, document, json.dumps(metadata) if metadata is not None else None)
+                        for offset, (id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                    ]
+                )
+            self._drop_rows(existing.values())
+            self.segments.append(segment)
+
+    def add(self, ids: List[str], embeddings=None, documents: Optional[List[str]] = None, metadatas: Optional[List[Dict]] = None):
+        self._write(ids, embeddings, documents, metadatas, replace=False)
+
+    def upsert(self, ids: List[str], embeddings=None, documents: Optional[List[str]] = None, metadatas: Optional[List[Dict]] = None):
+        self._write(ids, embeddings, documents, metadatas, replace=True)
+
+    def update(self, ids: List[str], metadatas: List[Dict]):
+        """Replace the metadata of existing rows, leaving their vectors alone"""
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE items SET metadata = ? WHERE id = ?",
+                    [(json.dumps(metadata) if metadata is not None else None, id) for id, metadata in zip(ids, metadatas)]
+                )
+
+    def _positions(self, ids: List[str]) -> Dict[str, tuple]:
+        positions = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for id, segment, offset in self.conn.execute(
+                f"SELECT id, segment, offset FROM items WHERE id IN ({placeholders})", chunk
+            ):
+                positions[id] = (segment, offset)
+        return positions
+
+    @staticmethod
+    def _where_clause(where: Optional[Dict]):
+        # Equality on top-level metadata keys, e.g. {"video_id": "abc"}; a list matches any of its values
+        if not where:
+            return "", []
+        clauses = []
+        params = []
+        for key, value in where.items():
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append(f"json_extract(metadata, '$.' || ?) IN ({','.join('?' * len(value))})")
+                params += [key] + value
+            else:
+                clauses.append("json_extract(metadata, '$.' || ?) = ?")
+                params += [key, value]
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _select(self, ids: Optional[List[str]], where: Optional[Dict]):
+        sql, params = self._where_clause(where)
+        query = "SELECT id, document, metadata FROM items" + sql
+        if ids is None:
+            return list(self.conn.execute(query + " ORDER BY segment, offset", params))
+        by_id = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            clause = (" AND " if sql else " WHERE ") + f"id IN ({placeholders})"
+            for row in self.conn.execute(query + clause, params + chunk):
+                by_id[row[0]] = row
+        return [by_id[id] for id in ids if id in by_id]
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, include: Optional[List[str]] = None) -> Dict:
+        if include is None:
+            include = ["metadatas", "documents"]
+        with self.lock:
+            rows = self._select(ids, where)
+        result = {"ids": [row[0] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [row[1] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(row[2]) if row[2] is not None else None for row in rows]
+        return result
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        with self.lock:
+            self._refresh()
+            doomed = [row[0] for row in self._select(ids, where)]
+            positions = self._positions(doomed)
+            with self.conn:
+                self.conn.executemany("DELETE FROM items WHERE id = ?", [(id,) for id in doomed])
+            self._drop_rows(positions.values())
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def _rows_at(self, positions: List[tuple]) -> Dict[tuple, tuple]:
+        """(id, document, metadata) of the rows at the given (segment, offset) positions"""
+        rows = {}
+        positions = list(set(positions))
+        for start in range(0, len(positions), 400):
+            chunk = positions[start:start + 400]
+            # Joining a VALUES list, unlike (segment, offset) IN (...), uses the position index
+            values = ",".join("(?, ?)" for _ in chunk)
+            for segment, offset, id, document, metadata in self.conn.execute(
+                f"WITH hits(segment, offset) AS (VALUES {values}) "
+                "SELECT items.segment, items.offset, id, document, metadata FROM hits "
+                "JOIN items ON items.segment = hits.segment AND items.offset = hits.offset",
+                [value for position in chunk for value in position]
+            ):
+                rows[(segment, offset)] = (id, document, metadata)
+        return rows
+
+    def _scores(self, queries: np.ndarray):
+        """
+        Cosine scores of each query against every stored row, -inf for deleted
+        rows, along with the (start column, segment number) of each segment
+        """
+        blocks = []
+        starts = []
+        start = 0
+        for segment in self.segments:
+            if not segment.live.any():
+                continue
+            scores = segment.scores(queries)
+            scores[:, ~segment.live] = -np.inf
+            blocks.append(scores)
+            starts.append((start, segment.number))
+            start += len(segment.vectors)
+        if not blocks:
+            return np.empty((len(queries), 0), dtype=np.float32), starts
+        return np.concatenate(blocks, axis=1), starts
+
+    def query(
+        self,
+        query_texts: Optional[List[str]] = None,
+        query_embeddings=None,
+        n_results: int = 10,
+        include: Optional[List[str]] = None,
+        where: Optional[Dict] = None,
+    ) -> Dict:
+        """Nearest rows for each query, scoring the whole batch with one matrix product per segment"""
+        if query_embeddings is None:
+            query_embeddings = self._embed(query_texts)
+        queries = self._normalize(query_embeddings)
+
+        with self.lock:
+            self._refresh()
+            scores, starts = self._scores(queries)
+            columns = [start for start, _ in starts]
+            k = min(n_results, int(sum(segment.live.sum() for segment in self.segments)))
+            if where:
+                # Only rows whose metadata matches can be returned
+                sql, params = self._where_clause(where)
+                offsets = {}
+                for segment_number, offset in self.conn.execute("SELECT segment, offset FROM items" + sql, params):
+                    offsets.setdefault(segment_number, []).append(offset)
+                allowed = np.zeros(scores.shape[1], dtype=bool)
+                for start, segment_number in starts:
+                    allowed[[start + offset for offset in offsets.get(segment_number, [])]] = True
+                scores[:, ~allowed] = -np.inf
+                k = min(k, int(allowed.sum()))
+            tops = []
+            for row in scores:
+                if k == 0:
+                    top = np.array([], dtype=int)
+                else:
+                    top = np.argpartition(-row, k - 1)[:k]
+                    top = top[np.argsort(-row[top])]
+                positions = []
+                for index in top:
+                    start, segment_number = starts[bisect.bisect_right(columns, index) - 1]
+                    positions.append((segment_number, int(index - start)))
+                tops.append((row, top, positions))
+            found = self._rows_at([position for _, _, positions in tops for position in positions])
+
+            result = {"ids": [], "distances": [], "documents": [], "metadatas": []}
+            for row, top, positions in tops:
+                # Rows deleted by another process since the refresh are left out
+                hits = [
+                    (found[position], max(0.0, float(2.0 - 2.0 * row[index])))
+                    for index, position in zip(top, positions) if position in found
+                ]
+                result["ids"].append([item[0] for item, _ in hits])
+                result["documents"].append([item[1] for item, _ in hits])
+                result["metadatas"].append([json.loads(item[2]) if item[2] is not None else None for item, _ in hits])
+                result["distances"].append([distance for _, distance in hits])
+        return result
+
+    def compact(self):
+        """Rewrite all live rows into a single segment and remove the old files"""
+        with self.lock:
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self._refresh()
+                rows = list(self.conn.execute("SELECT id, segment, offset FROM items ORDER BY segment, offset"))
+                old_segments = self.segments
+                if rows:
+                    by_number = {segment.number: segment for segment in old_segments}
+                    embeddings = np.concatenate([
+                        by_number[number].matrix[[offset for _, _, offset in group]]
+                        for number, group in itertools.groupby(rows, key=lambda row: row[1])
+                    ])
+                    segment = self._write_segment(embeddings)
+                    self.conn.executemany(
+                        "UPDATE items SET segment = ?, offset = ? WHERE id = ?",
+                        [(segment.number, offset, id) for offset, (id, _, _) in enumerate(rows)]
+                    )
+                self.conn.executemany(
+                    "DELETE FROM segments WHERE number = ?", [(old.number,) for old in old_segments]
+                )
+            self.segments = [segment] if rows else []
+            for old in old_segments:
+                os.remove(self._segment_path(old.number))
+                if old.scales is not None:
+                    os.remove(self._segment_path(old.number, ".scale"))
@@ -0,0 +1,265 @@
+import sys
+import os
+import argparse
+import json
+import queue
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import Dict, List, Optional
+
+from backend.llm_cache import LLMCache
+from backend.structured_data import TranscriptStructurer
+from backend.vector_store import QuestionVectorStore
+
+# Optional, only needed to expand playlist URLs
+try:
+    import yt_dlp
+except ImportError:
+    yt_dlp = None
+
+STAGES = ["download", "structure", "index"]
+
+class Checkpoint:
+    """Per-video progress file, so an interrupted run resumes at the first unfinished stage"""
+
+    def __init__(self, directory: str, video_id: str):
+        self.path = os.path.join(directory, f"{video_id}.json")
+        self.data = {"video_id": video_id, "stages": {}}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def done(self, stage: str) -> bool:
+        return stage in self.data["stages"]
+
+    def next_stage(self) -> Optional[str]:
+        for stage in STAGES:
+            if not self.done(stage):
+                return stage
+        return None
+
+    def _save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def mark(self, stage: str, seconds: float):
+        self.data["stages"][stage] = {"completed_at": time.time(), "seconds": round(seconds, 3)}
+        self.data.pop("error", None)
+        self._save()
+
+    def fail(self, stage: str, error: Exception):
+        self.data["error"] = {"stage": stage, "message": str(error), "failed_at": time.time()}
+        self._save()
+
+class StageStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.busy = 0.0
+
+    def record(self, seconds: float, ok: bool):
+        with self.lock:
+            self.busy += seconds
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+class Pipeline:
+    """
+    Runs download -> structure -> index for many videos. Each stage has its own
+    bounded worker pool, so one video can be structured while others download.
+    """
+
+    def __init__(self, downloader, structurer: TranscriptStructurer, store: QuestionVectorStore, data_dir: str = "backend/data"):
+        self.downloader = downloader
+        self.structurer = structurer
+        self.store = store
+        self.transcripts_dir = os.path.join(data_dir, "transcripts")
+        self.questions_dir = os.path.join(data_dir, "questions")
+        self.checkpoint_dir = os.path.join(data_dir, "pipeline")
+        for directory in [self.transcripts_dir, self.questions_dir, self.checkpoint_dir]:
+            os.makedirs(directory, exist_ok=True)
+        self.stats = {stage: StageStats() for stage in STAGES}
+
+    def download(self, video_id: str):
+        transcript = self.downloader.get_transcript(video_id)
+        if not transcript:
+            raise RuntimeError("no transcript available")
+        if not self.downloader.save_transcript(transcript, video_id, directory=self.transcripts_dir):
+            raise RuntimeError("could not save transcript")
+
+    def structure(self, video_id: str):
+        transcript = self.structurer.load_transcript(os.path.join(self.transcripts_dir, f"{video_id}.txt"))
+        if not transcript:
+            raise RuntimeError("transcript file missing, download it again")
+        sections = self.structurer.structure_transcript(transcript)
+        if not sections:
+            raise RuntimeError("no sections extracted")
+        if not self.structurer.save_questions(sections, os.path.join(self.questions_dir, f"{video_id}.txt")):
+            raise RuntimeError("could not save questions")
+
+    def index(self, video_id: str):
+        for section_num in [2, 3]:
+            filename = os.path.join(self.questions_dir, f"{video_id}_section{section_num}.txt")
+            if os.path.exists(filename):
+                self.store.index_questions_file(filename, section_num)
+
+    def run(self, video_ids: List[str], workers: Dict[str, int]) -> Dict:
+        queues = {stage: queue.Queue() for stage in STAGES}
+        remaining = [0]
+        remaining_lock = threading.Lock()
+        finished = threading.Event()
+        skipped = 0
+
+        def finish_one():
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    finished.set()
+
+        def worker(stage: str):
+            run_stage = getattr(self, stage)
+            while True:
+                checkpoint = queues[stage].get()
+                if checkpoint is None:
+                    return
+                video_id = checkpoint.data["video_id"]
+                start = time.perf_counter()
+                try:
+                    run_stage(video_id)
+                except Exception as e:
+                    elapsed = time.perf_counter() - start
+                    self.stats[stage].record(elapsed, ok=False)
+                    checkpoint.fail(stage, e)
+                    print(f"[{stage}] {video_id} failed: {str(e)}")
+                    finish_one()
+                    continue
+                elapsed = time.perf_counter() - start
+                self.stats[stage].record(elapsed, ok=True)
+                checkpoint.mark(stage, elapsed)
+                print(f"[{stage}] {video_id} done in {elapsed:.2f}s")
+                next_stage = checkpoint.next_stage()
+                if next_stage:
+                    queues[next_stage].put(checkpoint)
+                else:
+                    finish_one()
+
+        pending = []
+        for video_id in dict.fromkeys(video_ids):
+            checkpoint = Checkpoint(self.checkpoint_dir, video_id)
+            if checkpoint.next_stage() is None:
+                skipped += 1
+            else:
+                pending.append(checkpoint)
+        remaining[0] = len(pending)
+        if not pending:
+            finished.set()
+
+        threads = [
+            threading.Thread(target=worker, args=(stage,), name=f"{stage}-{i}", daemon=True)
+            for stage in STAGES
+            for i in range(max(1, workers.get(stage, 1)))
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for checkpoint in pending:
+            queues[checkpoint.next_stage()].put(checkpoint)
+
+        finished.wait()
+        for stage in STAGES:
+            for _ in range(max(1, workers.get(stage, 1))):
+                queues[stage].put(None)
+        for thread in threads:
+            thread.join()
+
+        return {"wall_seconds": time.perf_counter() - start, "skipped": skipped, "videos": len(pending)}
+
+    def report(self, summary: Dict, workers: Dict[str, int]):
+        wall = summary["wall_seconds"]
+        print(f"\n{summary['videos']} videos processed in {wall:.2f}s, {summary['skipped']} already complete")
+        print(f"{'stage':<10} {'workers':>7} {'done':>5} {'failed':>6} {'avg s':>7} {'videos/min':>10}")
+        for stage in STAGES:
+            stats = self.stats[stage]
+            runs = stats.completed + stats.failed
+            average = stats.busy / runs if runs else 0.0
+            throughput = 60 * stats.completed / wall if wall else 0.0
+            print(f"{stage:<10} {workers.get(stage, 1):>7} {stats.completed:>5} {stats.failed:>6} {average:>7.2f} {throughput:>10.1f}")
+
+def playlist_video_ids(url: str) -> List[str]:
+    if yt_dlp is None:
+        raise RuntimeError("Expanding playlists needs yt-dlp: pip install yt-dlp")
+    with yt_dlp.YoutubeDL({"extract_flat": True, "quiet": True}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return [entry["id"] for entry in info.get("entries", []) if entry and entry.get("id")]
+
+def read_video_ids(args) -> List[str]:
+    video_ids = list(args.video_ids)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            video_ids += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if args.playlist:
+        video_ids += playlist_video_ids(args.playlist)
+    return video_ids
+
+def build_pipeline(args) -> Pipeline:
+    if args.fake:
+        # Offline run: every video gets the bundled transcript and questions.
+        # Fake replies are not cached, so they can't be served to later real runs
+        from backend.fakes import FakeBedrockRuntime, FakeTranscriptDownloader
+
+        def bundled_questions(prompt: str) -> str:
+            section_num = 3 if "問題3" in prompt.split("\n")[0] else 2
+            with open(f"backend/data/questions/sY7L5cfCWno_section{section_num}.txt", 'r', encoding='utf-8') as f:
+                return f.read()
+
+        downloader = FakeTranscriptDownloader("backend/data/transcripts/sY7L5cfCWno.txt", latency=args.fake_latency)
+        structurer = TranscriptStructurer(client=FakeBedrockRuntime(latency=args.fake_latency, responder=bundled_questions))
+        store = QuestionVectorStore(
+            os.path.join(args.data_dir, "vectorstore"), embedding_backend="local", index_backend=args.index_backend
+        )
+    else:
+        from backend.get_transcript import YouTubeTranscriptDownloader
+
+        downloader = YouTubeTranscriptDownloader()
+        # Keep the response cache with the rest of this run's data
+        structurer = TranscriptStructurer(cache=LLMCache(os.path.join(args.data_dir, "llm_cache.sqlite3")))
+        store = QuestionVectorStore(os.path.join(args.data_dir, "vectorstore"), index_backend=args.index_backend)
+    return Pipeline(downloader, structurer, store, data_dir=args.data_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Download, structure and index JLPT listening videos")
+    parser.add_argument("video_ids", nargs="*", help="YouTube video ids")
+    parser.add_argument("--file", help="File with one video id per line")
+    parser.add_argument("--playlist", help="Playlist URL (needs yt-dlp)")
+    parser.add_argument("--data-dir", default="backend/data")
+    parser.add_argument("--download-workers", type=int, default=4)
+    parser.add_argument("--structure-workers", type=int, default=2)
+    # Chroma collections aren't safe to write from several threads
+    parser.add_argument("--index-workers", type=int, default=1)
+    parser.add_argument("--index-backend", default="chroma", choices=["chroma", "numpy"])
+    parser.add_argument("--fake", action="store_true", help="Use local stand-ins instead of YouTube and Bedrock")
+    parser.add_argument("--fake-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    video_ids = read_video_ids(args)
+    if not video_ids:
+        parser.error("no video ids given")
+
+    workers = {
+        "download": args.download_workers,
+        "structure": args.structure_workers,
+        "index": args.index_workers,
+    }
+    pipeline = build_pipeline(args)
+    summary = pipeline.run(video_ids, workers)
+    pipeline.report(summary, workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+DEFAULT_QUESTION_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "question_cache.sqlite3")
+
+def question_key(question: Dict) -> str:
+    return hashlib.sha256(json.dumps(question, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+class SemanticQuestionCache:
+    """
+    Generated questions keyed by an embedding of the context they were
+    generated from (section, topic and the retrieved example questions).
+
+    A lookup serves a stored question of the same section and topic whose
+    context is at least `threshold` cosine-similar, that the learner hasn't
+    seen yet. Similarity alone can't tell topics apart: retrieval returns the
+    same example questions for most topics, so contexts differ only in their
+    topic line.
+    Freshness: questions older than max_age seconds or already served
+    max_serves times are no longer served, and a `refresh_rate` fraction of
+    lookups skips the cache so new questions keep being added.
+    """
+
+    def __init__(
+        self,
+        embedding_fn,
+        path: str = DEFAULT_QUESTION_CACHE_PATH,
+        threshold: float = 0.95,
+        max_age: float = 30 * 24 * 3600,
+        max_serves: int = 20,
+        refresh_rate: float = 0.2,
+    ):
+        self.embedding_fn = embedding_fn
+        # Embeddings of different models can't be compared
+        self.model_id = getattr(embedding_fn, "model_id", type(embedding_fn).__name__)
+        self.path = path
+        self.threshold = threshold
+        self.max_age = max_age
+        self.max_serves = max_serves
+        self.refresh_rate = refresh_rate
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS questions (
+                key TEXT PRIMARY KEY,
+                section INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                model_id TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                question TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                serves INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("DROP INDEX IF EXISTS idx_questions_section")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_questions_topic ON questions(section, topic, model_id, created_at)"
+        )
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                learner_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (learner_id, key)
+            )
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def context_text(section_num: int, topic: str, context: str) -> str:
+        return f"Section {section_num}\nTopic: {topic}\n{context}"
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embedding_fn([text])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, section_num: int, topic: str, context: str, learner_id: str) -> Optional[Dict]:
+        """A cached question for this context that the learner hasn't seen, or None"""
+        if random.random() < self.refresh_rate:
+            with self.lock:
+                self.refreshes += 1
+            return None
+
+        query = self._embed(self.context_text(section_num, topic, context))
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT key, embedding, question, serves FROM questions
+                WHERE section = ? AND topic = ? AND model_id = ? AND created_at >= ? AND serves < ?
+                AND key NOT IN (SELECT key FROM seen WHERE learner_id = ?)
+                """,
+                (section_num, topic, self.model_id, time.time() - self.max_age, self.max_serves, learner_id)
+            ).fetchall()
+            best = None
+            if rows:
+                embeddings = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+                similarities = embeddings @ query
+                # Among close enough questions, prefer the least served to spread questions around
+                candidates = [
+                    (row[3], -float(similarity), row)
+                    for row, similarity in zip(rows, similarities)
+                    if similarity >= self.threshold
+                ]
+                if candidates:
+                    best = min(candidates, key=lambda candidate: candidate[:2])[2]
+            if best is None:
+                self.misses += 1
+                return None
+            key, _, question, _ = best
+            now = time.time()
+            self.conn.execute("UPDATE questions SET serves = serves + 1 WHERE key = ?", (key,))
+            self.conn.execute("INSERT OR REPLACE INTO seen (learner_id, key, seen_at) VALUES (?, ?, ?)", (learner_id, key, now))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(question)
+
+    def store(self, section_num: int, topic: str, context: str, question: Dict, learner_id: Optional[str] = None):
+        """Add a freshly generated question, marking it seen by the learner it was generated for"""
+        embedding = self._embed(self.context_text(section_num, topic, context))
+        key = question_key(question)
+        now = time.time()
+        with self.lock:
+            # Expired questions will never be served again
+            self.conn.execute("DELETE FROM questions WHERE created_at < ?", (now - self.max_age,))
+            self.conn.execute("DELETE FROM seen WHERE key NOT IN (SELECT key FROM questions)")
+            self.conn.execute(
+                "INSERT OR IGNORE INTO questions (key, section, topic, model_id, embedding, question, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, section_num, topic, self.model_id, embedding.tobytes(), json.dumps(question, ensure_ascii=False), now)
+            )
+            if learner_id:
+                self.conn.execute("INSERT OR REPLACE INTO seen (learner_id, key, seen_at) VALUES (?, ?, ?)", (learner_id, key, now))
+            self.conn.commit()
+
+    def mark_seen(self, learner_id: str, question: Dict):
+        """Record a question the learner got some other way (e.g. pre-generated)"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO seen (learner_id, key, seen_at) VALUES (?, ?, ?)",
+                (learner_id, question_key(question), time.time())
+            )
+            self.conn.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.refreshes
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
@@ -1,14 +1,117 @@
 import boto3
 import json
-from typing import Dict, List, Optional
+import re
+import time
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from backend.vector_store import QuestionVectorStore
+from backend.llm_cache import CachedConverseClient
+from backend.question_cache import SemanticQuestionCache
+
+# Options used when the model doesn't return exactly four
+DEFAULT_OPTIONS = [
+    "ピザを食べる",
+    "ハンバーガーを食べる",
+    "サラダを食べる",
+    "パスタを食べる"
+]
+
+FIELD_PREFIXES = ["Introduction", "Conversation", "Situation", "Question", "Options", "Answer", "Explanations"]
+
+# Fields given as numbered lists
+LIST_FIELDS = ["Options", "Explanations"]
+
+class QuestionStreamParser:
+    """
+    Line parser for generated questions that can be fed text as it arrives.
+
+    A field is complete once the next field's header (e.g. "Question:") or
+    the end of the text is reached; feed() and close() return the fields
+    completed by that call as (field, value) pairs.
+    """
 
-class QuestionGenerator:
     def __init__(self):
+        self.buffer = ""
+        self.question = {}
+        self.current_key = None
+        self.current_value = []
+
+    def _finish_field(self) -> List[Tuple[str, object]]:
+        if not self.current_key:
+            return []
+        if self.current_key in LIST_FIELDS:
+            value = self.current_value
+        else:
+            value = ' '.join(self.current_value)
+        self.question[self.current_key] = value
+        return [(self.current_key, value)]
+
+    def _feed_line(self, line: str) -> List[Tuple[str, object]]:
+        line = line.strip()
+        if not line:
+            return []
+        for prefix in FIELD_PREFIXES:
+            if line.startswith(f"{prefix}:"):
+                completed = self._finish_field()
+                self.current_key = prefix
+                rest = line.replace(f"{prefix}:", "").strip()
+                self.current_value = [] if prefix in LIST_FIELDS else [rest]
+                return completed
+        if len(line) > 1 and line[0].isdigit() and line[1] == "." and self.current_key in LIST_FIELDS:
+            self.current_value.append(line[2:].strip())
+        elif self.current_key == 'Explanations' and self.current_value:
+            # An explanation wrapped onto the next line
+            self.current_value[-1] += ' ' + line
+        elif self.current_key:
+            self.current_value.append(line)
+        return []
+
+    def feed(self, text: str) -> List[Tuple[str, object]]:
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split('\n')
+        completed = []
+        for line in lines:
+            completed += self._feed_line(line)
+        return completed
+
+    def close(self) -> List[Tuple[str, object]]:
+        completed = self._feed_line(self.buffer)
+        self.buffer = ""
+        completed += self._finish_field()
+        self.current_key = None
+        return completed
+
+    def result(self) -> Dict:
+        question = dict(self.question)
+        # Ensure we have exactly 4 options
+        if len(question.get('Options', [])) != 4:
+            # Use default options if we don't have exactly 4
+            question['Options'] = list(DEFAULT_OPTIONS)
+            # The answer was about the options we just replaced
+            question.pop('Answer', None)
+        
+        # The answer as an option number, with one explanation per option
+        answer = re.search(r'\d+', str(question.get('Answer', '')))
+        if answer and 1 <= int(answer.group()) <= 4 and len(question.get('Explanations', [])) == 4:
+            question['Answer'] = int(answer.group())
+        else:
+            question.pop('Answer', None)
+            question.pop('Explanations', None)
+        return question
+
+class QuestionGenerator:
+    def __init__(self, question_cache: Optional[Union[SemanticQuestionCache, bool]] = None):
         """Initialize Bedrock client and vector store"""
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name="us-east-1")
+        # Sampled generations bypass the response cache so questions keep varying
+        self.bedrock_client = CachedConverseClient(boto3.client('bedrock-runtime', region_name="us-east-1"))
         self.vector_store = QuestionVectorStore()
         self.model_id = "amazon.nova-lite-v1:0"
+        self.last_stream_timing = None
+        
+        # Questions generated before from a similar context are served to learners
+        # who haven't seen them; pass question_cache=False to always generate
+        if question_cache is None:
+            question_cache = SemanticQuestionCache(self.vector_store.embedding_fn)
+        self.question_cache = question_cache or None
 
     def _invoke_bedrock(self, prompt: str) -> Optional[str]:
         """Invoke Bedrock with the given prompt"""
@@ -31,8 +134,8 @@ class QuestionGenerator:
             print(f"Error invoking Bedrock: {str(e)}")
             return None
 
-    def generate_similar_question(self, section_num: int, topic: str) -> Dict:
-        """Generate a new question similar to existing ones on a given topic"""
+    def build_context(self, section_num: int, topic: str) -> Optional[str]:
+        """Example questions similar to the topic, as text for the prompt"""
         # Get similar questions for context
         similar_questions = self.vector_store.search_similar_questions(section_num, topic, n_results=3)
         
@@ -60,9 +163,17 @@ class QuestionGenerator:
                     for i, opt in enumerate(q['Options'], 1):
                         context += f"{i}. {opt}\n"
             context += "\n"
+        return context
+
+    def build_prompt(self, section_num: int, topic: str, context: Optional[str] = None) -> Optional[str]:
+        """Prompt for a new question on a topic, using similar stored questions as examples"""
+        if context is None:
+            context = self.build_context(section_num, topic)
+        if not context:
+            return None
 
         # Create prompt for generating new question
-        prompt = f"""Based on the following example JLPT listening questions, create a new question about {topic}.
+        return f"""Based on the following example JLPT listening questions, create a new question about {topic}.
         The question should follow the same format but be different from the examples.
         Make sure the question tests listening comprehension and has a clear correct answer.
         
@@ -72,82 +183,153 @@ class QuestionGenerator:
         Conversation/Question, and Options). Make sure the question is challenging but fair, and the options are plausible 
         but with only one clearly correct answer. Return ONLY the question without any additional text.
         
+        After the options, add the correct option number and a brief explanation for every option of why it is
+        correct or incorrect, in exactly this format:
+        Answer: [number of the correct option]
+        Explanations:
+        1. [explanation for option 1]
+        2. [explanation for option 2]
+        3. [explanation for option 3]
+        4. [explanation for option 4]
+        
         New Question:
         """
 
+    def parse_question(self, response: str) -> Optional[Dict]:
+        """Parse a generated question from the model's text"""
+        try:
+            parser = QuestionStreamParser()
+            parser.feed(response)
+            parser.close()
+            return parser.result()
+        except Exception as e:
+            print(f"Error parsing generated question: {str(e)}")
+            return None
+
+    def _cached_question(self, section_num: int, topic: str, context: str, learner_id: Optional[str]) -> Optional[Dict]:
+        if self.question_cache is None or learner_id is None:
+            return None
+        try:
+            return self.question_cache.lookup(section_num, topic, context, learner_id)
+        except Exception as e:
+            print(f"Error looking up question cache: {str(e)}")
+            return None
+
+    def _cache_question(self, section_num: int, topic: str, context: str, question: Optional[Dict], learner_id: Optional[str]):
+        if self.question_cache is None or not question:
+            return
+        try:
+            self.question_cache.store(section_num, topic, context, question, learner_id)
+        except Exception as e:
+            print(f"Error storing question in cache: {str(e)}")
+
+    def generate_similar_question(self, section_num: int, topic: str, learner_id: Optional[str] = None) -> Dict:
+        """
+        Generate a new question similar to existing ones on a given topic.
+        With a learner_id, a cached question the learner hasn't seen may be
+        returned instead; every generated question is added to the cache.
+        """
+        context = self.build_context(section_num, topic)
+        if not context:
+            return None
+        cached = self._cached_question(section_num, topic, context, learner_id)
+        if cached:
+            return cached
+
         # Generate new question
-        response = self._invoke_bedrock(prompt)
+        response = self._invoke_bedrock(self.build_prompt(section_num, topic, context))
         if not response:
             return None
 
         # Parse the generated question
+        question = self.parse_question(response)
+        self._cache_question(section_num, topic, context, question, learner_id)
+        return question
+
+    def generate_similar_question_stream(
+        self, section_num: int, topic: str, learner_id: Optional[str] = None
+    ) -> Iterator[Tuple[str, object]]:
+        """
+        Stream a new question, yielding (field, value) as each field of it is
+        complete, then ("done", question) with the parsed question (None if
+        generation failed). Timings end up in self.last_stream_timing.
+        A cached question (see generate_similar_question) is yielded at once.
+        """
+        start = time.perf_counter()
+        timing = {"time_to_first_token": None, "time_to_first_field": None, "total": None, "cached": False}
+        self.last_stream_timing = timing
+
+        context = self.build_context(section_num, topic)
+        if not context:
+            yield "done", None
+            return
+
+        cached = self._cached_question(section_num, topic, context, learner_id)
+        if cached:
+            timing["cached"] = True
+            timing["time_to_first_field"] = timing["total"] = time.perf_counter() - start
+            for field in FIELD_PREFIXES:
+                if field in cached:
+                    yield field, cached[field]
+            yield "done", cached
+            return
+
+        prompt = self.build_prompt(section_num, topic, context)
+
+        parser = QuestionStreamParser()
         try:
-            lines = response.strip().split('\n')
-            question = {}
-            current_key = None
-            current_value = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
+            response = self.bedrock_client.converse_stream(
+                modelId=self.model_id,
+                messages=[{"role": "user", "content": [{"text": prompt}]}],
+                inferenceConfig={"temperature": 0.7}
+            )
+            for event in response['stream']:
+                text = event.get('contentBlockDelta', {}).get('delta', {}).get('text')
+                if not text:
                     continue
-                    
-                if line.startswith("Introduction:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Introduction'
-                    current_value = [line.replace("Introduction:", "").strip()]
-                elif line.startswith("Conversation:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Conversation'
-                    current_value = [line.replace("Conversation:", "").strip()]
-                elif line.startswith("Situation:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Situation'
-                    current_value = [line.replace("Situation:", "").strip()]
-                elif line.startswith("Question:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Question'
-                    current_value = [line.replace("Question:", "").strip()]
-                elif line.startswith("Options:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Options'
-                    current_value = []
-                elif line[0].isdigit() and line[1] == "." and current_key == 'Options':
-                    current_value.append(line[2:].strip())
-                elif current_key:
-                    current_value.append(line)
-            
-            if current_key:
-                if current_key == 'Options':
-                    question[current_key] = current_value
-                else:
-                    question[current_key] = ' '.join(current_value)
-            
-            # Ensure we have exactly 4 options
-            if 'Options' not in question or len(question.get('Options', [])) != 4:
-                # Use default options if we don't have exactly 4
-                question['Options'] = [
-                    "ピザを食べる",
-                    "ハンバーガーを食べる",
-                    "サラダを食べる",
-                    "パスタを食べる"
-                ]
-            
-            return question
+                if timing["time_to_first_token"] is None:
+                    timing["time_to_first_token"] = time.perf_counter() - start
+                for field, value in parser.feed(text):
+                    if timing["time_to_first_field"] is None:
+                        timing["time_to_first_field"] = time.perf_counter() - start
+                    yield field, value
+            for field, value in parser.close():
+                if timing["time_to_first_field"] is None:
+                    timing["time_to_first_field"] = time.perf_counter() - start
+                yield field, value
+            question = parser.result()
         except Exception as e:
-            print(f"Error parsing generated question: {str(e)}")
-            return None
+            print(f"Error streaming from Bedrock: {str(e)}")
+            question = None
+
+        timing["total"] = time.perf_counter() - start
+        self._cache_question(section_num, topic, context, question, learner_id)
+        yield "done", question
 
-    def get_feedback(self, question: Dict, selected_answer: int) -> Dict:
-        """Generate feedback for the selected answer"""
+    def get_feedback(self, question: Dict, selected_answer: int) -> Optional[Dict]:
+        """
+        Feedback for the selected answer. Questions generated with their answer
+        and explanations are checked locally; older ones ask the model, and
+        None is returned if no answer can be determined.
+        """
         if not question or 'Options' not in question:
             return None
 
+        if 'Answer' in question and 'Explanations' in question:
+            correct_answer = question['Answer']
+            explanations = question['Explanations']
+            explanation = explanations[selected_answer - 1]
+            if selected_answer != correct_answer:
+                explanation += f"\n\nThe correct answer is {correct_answer}: {explanations[correct_answer - 1]}"
+            return {
+                "correct": selected_answer == correct_answer,
+                "explanation": explanation,
+                "correct_answer": correct_answer
+            }
+        return self._generate_feedback(question, selected_answer)
+
+    def _generate_feedback(self, question: Dict, selected_answer: int) -> Optional[Dict]:
+        """Ask the model for feedback, for questions saved without their answer"""
         # Create prompt for generating feedback
         prompt = f"""Given this JLPT listening question and the selected answer, provide feedback explaining if it's correct 
         and why. Keep the explanation clear and concise.
@@ -178,11 +360,15 @@ class QuestionGenerator:
         try:
             # Parse the JSON response
             feedback = json.loads(response.strip())
-            return feedback
-        except:
-            # If JSON parsing fails, return a basic response with a default correct answer
-            return {
-                "correct": False,
-                "explanation": "Unable to generate detailed feedback. Please try again.",
-                "correct_answer": 1  # Default to first option
-            }
+            correct_answer = int(feedback['correct_answer'])
+        except Exception as e:
+            # Guessing an answer would mark learners wrong for no reason
+            print(f"Error parsing feedback: {str(e)}")
+            return None
+        if not 1 <= correct_answer <= len(question['Options']):
+            return None
+        return {
+            "correct": selected_answer == correct_answer,
+            "explanation": feedback.get('explanation', ''),
+            "correct_answer": correct_answer
+        }
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_POOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "question_pool.json")
+
+# Section of the example questions used for each practice type
+SECTION_NUMS = {
+    "Dialogue Practice": 2,
+    "Phrase Matching": 3,
+}
+
+class QuestionPool:
+    """
+    Keeps `depth` ready-made questions, with their audio, for each
+    (practice type, topic) so the UI can serve one without waiting for the
+    LLM and TTS. A background thread tops up the shallowest queue first, and
+    the queues are saved to `path` so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        question_generator,
+        audio_generator,
+        keys: List[Tuple[str, str]],
+        path: str = DEFAULT_POOL_PATH,
+        depth: int = 2,
+        retry_delay: float = 30.0,
+    ):
+        self.question_generator = question_generator
+        self.audio_generator = audio_generator
+        self.keys = list(keys)
+        self.path = path
+        self.depth = depth
+        self.retry_delay = retry_delay
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.served = 0
+        self.empty = 0
+        self.queues = self._load()
+
+    @staticmethod
+    def _key(practice_type: str, topic: str) -> str:
+        return f"{practice_type}|{topic}"
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        queues = {self._key(*key): [] for key in self.keys}
+        if not os.path.exists(self.path):
+            return queues
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except Exception as e:
+            print(f"Error loading question pool: {str(e)}")
+            return queues
+        for key, bundles in saved.items():
+            if key in queues:
+                # Audio files may have been cleaned up while the app was down
+                queues[key] = [
+                    bundle for bundle in bundles
+                    if not bundle.get("audio_file") or os.path.exists(bundle["audio_file"])
+                ]
+        return queues
+
+    def _save(self):
+        # Called with self.lock held
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.queues, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def start(self):
+        """Start refilling in the background"""
+        if self.depth > 0 and self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="question-pool", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def pop(self, practice_type: str, topic: str) -> Optional[Dict]:
+        """
+        Take the oldest ready bundle ({"question", "audio_file", "created_at"})
+        for this practice type and topic, or None if there isn't one yet.
+        """
+        key = self._key(practice_type, topic)
+        with self.lock:
+            queue = self.queues.get(key)
+            if not queue:
+                self.empty += 1
+                bundle = None
+            else:
+                bundle = queue.pop(0)
+                self.served += 1
+                self._save()
+        self.wakeup.set()
+        return bundle
+
+    def _next_key(self) -> Optional[str]:
+        """Key of the shallowest queue below depth"""
+        with self.lock:
+            depths = [(len(self.queues[self._key(*key)]), self._key(*key)) for key in self.keys]
+        shallow = [(size, key) for size, key in depths if size < self.depth]
+        return min(shallow)[1] if shallow else None
+
+    def generate(self, practice_type: str, topic: str) -> Optional[Dict]:
+        """Generate one bundle; the audio is left out if it can't be synthesized"""
+        question = self.question_generator.generate_similar_question(SECTION_NUMS[practice_type], topic)
+        if not question:
+            return None
+        audio_file = None
+        try:
+            audio_file = self.audio_generator.generate_audio(question)
+        except Exception as e:
+            print(f"Error pre-generating audio for {practice_type} - {topic}: {str(e)}")
+        return {
+            "question": question,
+            "audio_file": audio_file,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def _run(self):
+        while not self.stopped.is_set():
+            key = self._next_key()
+            if key is None:
+                # Every queue is full, wait for a pop
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+
+            practice_type, topic = key.split("|", 1)
+            start = time.perf_counter()
+            try:
+                bundle = self.generate(practice_type, topic)
+            except Exception as e:
+                print(f"Error pre-generating question for {practice_type} - {topic}: {str(e)}")
+                bundle = None
+            if bundle is None:
+                # Likely throttled or offline; don't spin on it
+                self.stopped.wait(self.retry_delay)
+                continue
+
+            with self.lock:
+                self.queues[key].append(bundle)
+                self._save()
+            print(f"Pre-generated question for {practice_type} - {topic} in {time.perf_counter() - start:.1f}s")
+
+    def stats(self) -> Dict:
+        with self.lock:
+            ready = {key: len(queue) for key, queue in self.queues.items()}
+        pops = self.served + self.empty
+        return {
+            "ready": ready,
+            "served": self.served,
+            "empty": self.empty,
+            "hit_rate": self.served / pops if pops else 0.0,
+        }
@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_STORE_PATH = os.path.join(DATA_DIR, "questions.sqlite3")
+LEGACY_JSON_PATH = os.path.join(DATA_DIR, "stored_questions.json")
+
+class QuestionStore:
+    """
+    Saved questions in SQLite, indexed by creation time and by
+    (practice type, topic), so saving one question or listing a page of them
+    doesn't touch the rest.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, legacy_json: Optional[str] = LEGACY_JSON_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id TEXT PRIMARY KEY,
+                practice_type TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                question TEXT NOT NULL,
+                audio_file TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_created_at ON questions(created_at)")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_questions_type_topic ON questions(practice_type, topic, created_at)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.commit()
+        if legacy_json:
+            self.import_json(legacy_json)
+
+    def import_json(self, json_path: str) -> int:
+        """One-time import of the old stored_questions.json; returns the number of questions imported"""
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'imported_json'").fetchone():
+                return 0
+            if not os.path.exists(json_path):
+                return 0
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    stored_questions = json.load(f)
+            except Exception as e:
+                print(f"Error importing {json_path}: {str(e)}")
+                return 0
+            rows = [
+                (
+                    question_id,
+                    data["practice_type"],
+                    data["topic"],
+                    data["created_at"],
+                    json.dumps(data["question"], ensure_ascii=False),
+                    data.get("audio_file"),
+                )
+                for question_id, data in stored_questions.items()
+            ]
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO questions (id, practice_type, topic, created_at, question, audio_file) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('imported_json', ?)",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),)
+            )
+            self.conn.commit()
+        print(f"Imported {len(rows)} questions from {json_path}")
+        return len(rows)
+
+    def add(self, question: Dict, practice_type: str, topic: str, audio_file: Optional[str] = None) -> str:
+        """Save a question and return its id"""
+        now = datetime.now()
+        # Microseconds keep ids unique when several questions are saved within a second
+        question_id = now.strftime("%Y%m%d_%H%M%S_%f")
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO questions (id, practice_type, topic, created_at, question, audio_file) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    question_id, practice_type, topic, now.strftime("%Y-%m-%d %H:%M:%S"),
+                    json.dumps(question, ensure_ascii=False), audio_file
+                )
+            )
+            self.conn.commit()
+        return question_id
+
+    def set_audio(self, question_id: str, audio_file: Optional[str]) -> bool:
+        with self.lock:
+            updated = self.conn.execute(
+                "UPDATE questions SET audio_file = ? WHERE id = ?", (audio_file, question_id)
+            ).rowcount
+            self.conn.commit()
+        return updated > 0
+
+    @staticmethod
+    def _filters(practice_type: Optional[str], topic: Optional[str]):
+        clauses, params = [], []
+        if practice_type:
+            clauses.append("practice_type = ?")
+            params.append(practice_type)
+        if topic:
+            clauses.append("topic = ?")
+            params.append(topic)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        question_id, practice_type, topic, created_at, question, audio_file = row
+        return {
+            "id": question_id,
+            "question": json.loads(question),
+            "practice_type": practice_type,
+            "topic": topic,
+            "created_at": created_at,
+            "audio_file": audio_file,
+        }
+
+    def get(self, question_id: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, practice_type, topic, created_at, question, audio_file FROM questions WHERE id = ?",
+                (question_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        practice_type: Optional[str] = None,
+        topic: Optional[str] = None,
+    ) -> List[Dict]:
+        """A page of saved questions, newest first"""
+        where, params = self._filters(practice_type, topic)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, practice_type, topic, created_at, question, audio_file FROM questions"
+                f"{where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def count(self, practice_type: Optional[str] = None, topic: Optional[str] = None) -> int:
+        where, params = self._filters(practice_type, topic)
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM questions{where}", params).fetchone()[0]
@@ -1,15 +1,27 @@
 from typing import Optional, Dict, List
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.llm_cache import CachedConverseClient, LLMCache
 
 # Model ID
 #MODEL_ID = "amazon.nova-micro-v1:0"
 MODEL_ID = "amazon.nova-lite-v1:0"
 
 class TranscriptStructurer:
-    def __init__(self, model_id: str = MODEL_ID):
+    def __init__(self, model_id: str = MODEL_ID, client=None, cache: Optional[LLMCache] = None):
         """Initialize Bedrock client"""
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name="us-east-1")
+        # Structuring runs at temperature 0, so identical transcripts are answered from the cache.
+        # A client passed in (e.g. a fake) is only cached when a cache is passed too, so its
+        # replies never end up in the shared cache under a real model id.
+        if client is None:
+            client = CachedConverseClient(boto3.client('bedrock-runtime', region_name="us-east-1"), cache=cache)
+        elif cache is not None:
+            client = CachedConverseClient(client, cache=cache)
+        self.bedrock_client = client
         self.model_id = model_id
         self.prompts = {
             1: """Extract questions from section 問題1 of this JLPT transcript where the answer can be determined solely from the conversation without needing visual aids.
@@ -144,10 +156,16 @@ class TranscriptStructurer:
         """Structure the transcript into three sections using separate prompts"""
         results = {}
         # Skipping section 1 for now
-        for section_num in range(2, 4):
-            result = self._invoke_bedrock(self.prompts[section_num], transcript)
-            if result:
-                results[section_num] = result
+        section_nums = list(range(2, 4))
+        # The sections are independent calls, so run them at the same time
+        with ThreadPoolExecutor(max_workers=len(section_nums)) as executor:
+            outputs = executor.map(
+                lambda section_num: self._invoke_bedrock(self.prompts[section_num], transcript),
+                section_nums
+            )
+            for section_num, result in zip(section_nums, outputs):
+                if result:
+                    results[section_num] = result
         return results
 
     def save_questions(self, structured_sections: Dict[int, str], base_filename: str) -> bool:
@@ -0,0 +1,52 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.local_embeddings import HashingEmbeddingFunction
+from backend.question_cache import SemanticQuestionCache
+
+# Retrieval returns the same example questions for most topics, so contexts
+# of different topics only differ in their topic line
+CONTEXT = """
+Example 1:
+Situation: 女の人と男の人が話しています。
+Question: 男の人は何を買いますか。
+Example 2:
+Situation: 店員と客が話しています。
+Question: 客はどれを選びましたか。
+"""
+
+test_question = {
+    "Situation": "デパートで女の人と店員が話しています。",
+    "Conversation": "女性: このかばん、いくらですか。\n店員: 5000円です。",
+    "Question": "女の人はいくら払いますか。",
+    "Options": ["3000円", "4000円", "5000円", "6000円"],
+}
+
+def make_cache(**kwargs) -> SemanticQuestionCache:
+    path = os.path.join(tempfile.mkdtemp(), "question_cache.sqlite3")
+    return SemanticQuestionCache(HashingEmbeddingFunction(), path=path, refresh_rate=0.0, **kwargs)
+
+def test_serves_question_for_same_topic():
+    cache = make_cache()
+    cache.store(2, "Shopping", CONTEXT, test_question, learner_id="learner-1")
+    assert cache.lookup(2, "Shopping", CONTEXT, "learner-2") == test_question
+    # Never twice to the same learner
+    assert cache.lookup(2, "Shopping", CONTEXT, "learner-1") is None
+
+def test_never_serves_question_for_other_topic():
+    cache = make_cache()
+    cache.store(2, "Shopping", CONTEXT, test_question, learner_id="learner-1")
+    # The contexts are similar enough to pass the threshold on their own
+    shopping = cache._embed(cache.context_text(2, "Shopping", CONTEXT))
+    for topic in ["Restaurant", "Travel"]:
+        other = cache._embed(cache.context_text(2, topic, CONTEXT))
+        assert float(shopping @ other) >= cache.threshold
+        assert cache.lookup(2, topic, CONTEXT, "learner-2") is None
+    assert cache.stats()["hits"] == 0
+
+if __name__ == "__main__":
+    test_serves_question_for_same_topic()
+    test_never_serves_question_for_other_topic()
+    print("Test completed successfully!")
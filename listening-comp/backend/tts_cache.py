@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from backend.embedding_cache import normalize_text
+
+class ClipCache:
+    """
+    Persistent cache of synthesized speech clips, keyed by provider, voice,
+    engine and a hash of the normalized text.
+
+    Clips are plain audio files in `directory` so they can be handed straight
+    to the audio assembler; an SQLite index tracks their size and last use.
+    Once the clips grow past max_bytes the least recently used are deleted,
+    except ones used within the last `grace` seconds, which may still be part
+    of an audio file being assembled.
+    """
+
+    def __init__(
+        self,
+        directory: str = "backend/data/tts_cache",
+        max_bytes: int = 200 * 1024 * 1024,
+        extension: str = "mp3",
+        grace: float = 60.0,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.grace = grace
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS clips (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                voice TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_clips_last_used ON clips(last_used)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM clips").fetchone()[0]
+
+    @staticmethod
+    def key(provider: str, voice: str, engine: str, text: str) -> str:
+        return hashlib.sha256(f"{provider}\0{voice}\0{engine}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.{self.extension}")
+
+    def get(self, provider: str, voice: str, engine: str, text: str) -> Optional[str]:
+        """Path of the cached clip, or None"""
+        key = self.key(provider, voice, engine, text)
+        path = self.path(key)
+        with self.lock:
+            row = self.conn.execute("SELECT size FROM clips WHERE key = ?", (key,)).fetchone()
+            if row and not os.path.exists(path):
+                # Removed behind our back
+                self.conn.execute("DELETE FROM clips WHERE key = ?", (key,))
+                self.conn.commit()
+                self.size -= row[0]
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE clips SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+            return path
+
+    def put(self, provider: str, voice: str, engine: str, text: str, audio: bytes) -> str:
+        """Store a clip and return its path"""
+        key = self.key(provider, voice, engine, text)
+        path = self.path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(audio)
+        os.replace(temp_path, path)
+        with self.lock:
+            previous = self.conn.execute("SELECT size FROM clips WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO clips (key, provider, voice, engine, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, voice, engine, len(audio), time.time())
+            )
+            self.size += len(audio) - (previous[0] if previous else 0)
+            self.conn.commit()
+            if self.size > self.max_bytes:
+                self._evict()
+        return path
+
+    def _evict(self):
+        # Trim to 90% of the limit so eviction doesn't run on every insert
+        target = self.max_bytes * 0.9
+        cutoff = time.time() - self.grace
+        doomed = []
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM clips WHERE last_used < ? ORDER BY last_used", (cutoff,)
+        ):
+            if self.size <= target:
+                break
+            doomed.append((key,))
+            self.size -= size
+        self.conn.executemany("DELETE FROM clips WHERE key = ?", doomed)
+        self.conn.commit()
+        for (key,) in doomed:
+            try:
+                os.unlink(self.path(key))
+            except FileNotFoundError:
+                pass
+        self.evictions += len(doomed)
+
+    def owns(self, path: str) -> bool:
+        """Whether path is a clip of this cache (and must not be deleted by callers)"""
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.directory)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM clips").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self.size,
+        }
@@ -1,20 +1,116 @@
 import chromadb
 from chromadb.utils import embedding_functions
+import glob
+import hashlib
 import json
 import os
+import re
+import sys
+import random
+import threading
+import time
 import boto3
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.bm25 import BM25Index
+from backend.embedding_cache import EmbeddingCache, normalize_text
+from backend.local_embeddings import HashingEmbeddingFunction
+from backend.numpy_index import NumpyCollection
+
+class EmbeddingError(Exception):
+    """Raised when an embedding could not be generated"""
+
+# Bedrock error codes worth retrying after backing off
+# Seconds between checks that a keyword index still has the collection's ids
+KEYWORD_CHECK_INTERVAL = 5.0
+
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+class AdaptiveRateLimiter:
+    """Spaces out requests, halving the rate on throttling and slowly raising it on success"""
+
+    def __init__(
+        self,
+        rate: float = 20.0,
+        min_rate: float = 1.0,
+        max_rate: float = 200.0,
+        increase: float = 1.0,
+        cooldown: float = 1.0,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        # A burst of in-flight requests is usually throttled together, so
+        # back off at most once per cooldown period
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+        self.last_throttle = 0.0
+
+    def acquire(self):
+        """Block until the caller may send the next request"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_throttle >= self.cooldown:
+                self.last_throttle = now
+                self.rate = max(self.min_rate, self.rate / 2)
 
 class BedrockEmbeddingFunction(embedding_functions.EmbeddingFunction):
-    def __init__(self, model_id="amazon.titan-embed-text-v1"):
+    def __init__(
+        self,
+        model_id="amazon.titan-embed-text-v1",
+        client=None,
+        max_workers: int = 8,
+        max_retries: int = 5,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ):
         """Initialize Bedrock embedding function"""
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name="us-east-1")
+        self.bedrock_client = client or boto3.client('bedrock-runtime', region_name="us-east-1")
         self.model_id = model_id
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.cache = cache
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0}
+        self._executor = None
+        self._lock = threading.Lock()
 
-    def __call__(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts using Bedrock"""
-        embeddings = []
-        for text in texts:
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embed")
+            return self._executor
+
+    def embed_text(self, text: str) -> List[float]:
+        """Embed a single text, retrying with backoff when Bedrock throttles"""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            self._count("requests")
             try:
                 response = self.bedrock_client.invoke_model(
                     modelId=self.model_id,
@@ -23,41 +119,134 @@ class BedrockEmbeddingFunction(embedding_functions.EmbeddingFunction):
                     })
                 )
                 response_body = json.loads(response['body'].read())
-                embedding = response_body['embedding']
-                embeddings.append(embedding)
+                self.rate_limiter.on_success()
+                return response_body['embedding']
             except Exception as e:
-                print(f"Error generating embedding: {str(e)}")
-                # Return a zero vector as fallback
-                embeddings.append([0.0] * 1536)  # Titan model uses 1536 dimensions
+                code = getattr(e, "response", {}).get("Error", {}).get("Code")
+                if code not in RETRYABLE_ERROR_CODES:
+                    raise EmbeddingError(f"Error generating embedding: {str(e)}") from e
+                self._count("throttled")
+                self.rate_limiter.on_throttle()
+                if attempt == self.max_retries:
+                    raise EmbeddingError(
+                        f"Embedding still throttled after {self.max_retries} retries: {str(e)}"
+                    ) from e
+                self._count("retries")
+                # Exponential backoff with jitter
+                time.sleep(min(10.0, 0.1 * 2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) <= 1 or self.max_workers <= 1:
+            return [self.embed_text(text) for text in texts]
+        # map() keeps the input order and re-raises the first failure; a failed
+        # text is never replaced by a placeholder vector
+        return list(self._get_executor().map(self.embed_text, texts))
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of texts using Bedrock, concurrently and in order"""
+        if self.cache is None:
+            return self._embed_texts(texts)
+
+        embeddings = self.cache.get_many(self.model_id, texts)
+        # Only cache misses go to the model, once per distinct normalized text
+        missing = {}
+        for text, embedding in zip(texts, embeddings):
+            if embedding is None:
+                missing.setdefault(normalize_text(text), text)
+        if missing:
+            stored = self.cache.put_many(self.model_id, list(missing.values()), self._embed_texts(list(missing.values())))
+            computed = dict(zip(missing, stored))
+            embeddings = [
+                computed[normalize_text(text)] if embedding is None else embedding
+                for text, embedding in zip(texts, embeddings)
+            ]
         return embeddings
 
+def ids_fingerprint(ids: List[str]) -> str:
+    """Hash of a set of ids; question ids contain a content hash, so edited questions change it"""
+    return hashlib.sha256("\n".join(sorted(ids)).encode("utf-8")).hexdigest()
+
+def question_document(section_num: int, question: Dict) -> str:
+    """Searchable document for a question"""
+    if section_num == 2:
+        return f"""
+                Situation: {question['Introduction']}
+                Dialogue: {question['Conversation']}
+                Question: {question['Question']}
+                """
+    return f"""
+                Situation: {question['Situation']}
+                Question: {question['Question']}
+                """
+
 class QuestionVectorStore:
-    def __init__(self, persist_directory: str = "backend/data/vectorstore"):
+    def __init__(
+        self,
+        persist_directory: str = "backend/data/vectorstore",
+        cache_path: Optional[str] = None,
+        embedding_backend: str = "bedrock",
+        index_backend: str = "chroma",
+    ):
         """Initialize the vector store for JLPT listening questions"""
         self.persist_directory = persist_directory
         
-        # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(path=persist_directory)
-        
-        # Use Bedrock's Titan embedding model
-        self.embedding_fn = BedrockEmbeddingFunction()
+        if embedding_backend == "bedrock":
+            # Use Bedrock's Titan embedding model, reusing embeddings of texts seen before
+            if cache_path is None:
+                cache_path = os.path.join(os.path.dirname(persist_directory), "embedding_cache.sqlite3")
+            self.embedding_fn = BedrockEmbeddingFunction(cache=EmbeddingCache(cache_path))
+            suffix = ""
+        elif embedding_backend == "local":
+            # Offline CPU embeddings; vectors differ from Titan's so they get their own collections
+            self.embedding_fn = HashingEmbeddingFunction()
+            suffix = "_local"
+        else:
+            raise ValueError(f"Unknown embedding backend: {embedding_backend}")
+        self.embedding_backend = embedding_backend
         
         # Create or get collections for each section type
-        self.collections = {
-            "section2": self.client.get_or_create_collection(
-                name="section2_questions",
-                embedding_function=self.embedding_fn,
-                metadata={"description": "JLPT listening comprehension questions - Section 2"}
-            ),
-            "section3": self.client.get_or_create_collection(
-                name="section3_questions",
-                embedding_function=self.embedding_fn,
-                metadata={"description": "JLPT phrase matching questions - Section 3"}
-            )
+        sections = {
+            "section2": ("section2_questions" + suffix, "JLPT listening comprehension questions - Section 2"),
+            "section3": ("section3_questions" + suffix, "JLPT phrase matching questions - Section 3"),
         }
+        if index_backend == "chroma":
+            # Initialize ChromaDB client
+            self.client = chromadb.PersistentClient(path=persist_directory)
+            self.collections = {
+                section: self.client.get_or_create_collection(
+                    name=name,
+                    embedding_function=self.embedding_fn,
+                    metadata={"description": description}
+                )
+                for section, (name, description) in sections.items()
+            }
+        elif index_backend == "numpy":
+            # Memory-mapped in-process index, much cheaper to open than Chroma
+            self.client = None
+            self.collections = {
+                section: NumpyCollection(
+                    os.path.join(persist_directory, "numpy", name),
+                    embedding_function=self.embedding_fn,
+                    metadata={"description": description}
+                )
+                for section, (name, description) in sections.items()
+            }
+        else:
+            raise ValueError(f"Unknown index backend: {index_backend}")
+        self.index_backend = index_backend
+        
+        # Keyword indexes for hybrid search, built from the collections on first use
+        self.keyword_indexes = {}  # section -> (ids fingerprint, BM25Index, time of the last check)
+        self.keyword_lock = threading.Lock()
 
-    def add_questions(self, section_num: int, questions: List[Dict], video_id: str):
-        """Add questions to the vector store"""
+    def add_questions(self, section_num: int, questions: List[Dict], video_id: str) -> Dict[str, int]:
+        """
+        Sync a video's questions into the vector store.
+
+        Ids are derived from the question content, so unchanged questions are
+        skipped (no embedding call), new or edited ones are added and ones no
+        longer present for the video are deleted. Returns the counts of each.
+        """
         if section_num not in [2, 3]:
             raise ValueError("Only sections 2 and 3 are currently supported")
             
@@ -66,10 +255,17 @@ class QuestionVectorStore:
         ids = []
         documents = []
         metadatas = []
+        seen = {}
         
         for idx, question in enumerate(questions):
-            # Create a unique ID for each question
-            question_id = f"{video_id}_{section_num}_{idx}"
+            # Create an ID from the question content; repeats of the same question get a counter
+            content_hash = hashlib.sha256(
+                json.dumps(question, ensure_ascii=False, sort_keys=True).encode("utf-8")
+            ).hexdigest()[:16]
+            seen[content_hash] = seen.get(content_hash, 0) + 1
+            question_id = f"{video_id}_{section_num}_{content_hash}"
+            if seen[content_hash] > 1:
+                question_id += f"_{seen[content_hash]}"
             ids.append(question_id)
             
             # Store the full question structure as metadata
@@ -77,55 +273,159 @@ class QuestionVectorStore:
                 "video_id": video_id,
                 "section": section_num,
                 "question_index": idx,
+                "content_hash": content_hash,
                 "full_structure": json.dumps(question)
             })
             
             # Create a searchable document from the question content
-            if section_num == 2:
-                document = f"""
-                Situation: {question['Introduction']}
-                Dialogue: {question['Conversation']}
-                Question: {question['Question']}
-                """
-            else:  # section 3
-                document = f"""
-                Situation: {question['Situation']}
-                Question: {question['Question']}
-                """
-            documents.append(document)
+            documents.append(question_document(section_num, question))
         
+        stored = collection.get(where={"video_id": video_id}, include=["metadatas"])
+        existing = dict(zip(stored['ids'], stored['metadatas']))
+        stale = sorted(set(existing) - set(ids))
+        new = [idx for idx, question_id in enumerate(ids) if question_id not in existing]
+        # Unchanged questions whose position in the file changed
+        moved = [
+            idx for idx, question_id in enumerate(ids)
+            if question_id in existing and (existing[question_id] or {}).get("question_index") != idx
+        ]
+        
+        if stale:
+            collection.delete(ids=stale)
+        if moved:
+            collection.update(ids=[ids[idx] for idx in moved], metadatas=[metadatas[idx] for idx in moved])
         # Add to collection
-        collection.add(
-            ids=ids,
-            documents=documents,
-            metadatas=metadatas
-        )
+        if new:
+            collection.add(
+                ids=[ids[idx] for idx in new],
+                documents=[documents[idx] for idx in new],
+                metadatas=[metadatas[idx] for idx in new]
+            )
+        if stale or new or moved:
+            with self.keyword_lock:
+                self.keyword_indexes.pop(f"section{section_num}", None)
+        return {"added": len(new), "unchanged": len(ids) - len(new), "deleted": len(stale)}
 
     def search_similar_questions(
         self, 
         section_num: int, 
         query: str, 
-        n_results: int = 5
+        n_results: int = 5,
+        where: Optional[Dict] = None,
+        mode: str = "hybrid"
     ) -> List[Dict]:
         """Search for similar questions in the vector store"""
+        return self.search_similar_questions_batch(section_num, [query], n_results, where, mode)[0]
+
+    def keyword_index(self, section_num: int) -> BM25Index:
+        """BM25 index of a section, rebuilt when the collection has changed"""
+        section = f"section{section_num}"
+        collection = self.collections[section]
+        with self.keyword_lock:
+            cached = self.keyword_indexes.get(section)
+            now = time.monotonic()
+            # Another process (e.g. the pipeline) may have indexed more questions
+            if cached and len(cached[1]) == collection.count() and now - cached[2] < KEYWORD_CHECK_INTERVAL:
+                return cached[1]
+            # ...or re-synced a video with as many questions as before but
+            # different text. Reading every id costs about 20 ms at 5k
+            # questions, so that is only checked every few seconds.
+            if cached and cached[0] == ids_fingerprint(collection.get(include=[])["ids"]):
+                index = cached[1]
+                fingerprint = cached[0]
+            else:
+                stored = collection.get(include=["documents", "metadatas"])
+                index = BM25Index()
+                index.add(stored["ids"], stored["documents"], stored["metadatas"])
+                fingerprint = ids_fingerprint(stored["ids"])
+            self.keyword_indexes[section] = (fingerprint, index, now)
+            return index
+
+    @staticmethod
+    def _chroma_where(where: Optional[Dict]) -> Optional[Dict]:
+        if not where:
+            return None
+        clauses = [
+            {key: {"$in": list(value)}} if isinstance(value, (list, tuple, set)) else {key: value}
+            for key, value in where.items()
+        ]
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def search_similar_questions_batch(
+        self,
+        section_num: int,
+        queries: List[str],
+        n_results: int = 5,
+        where: Optional[Dict] = None,
+        mode: str = "hybrid"
+    ) -> List[List[Dict]]:
+        """
+        Search for several queries at once, returning the similar questions for each.
+
+        mode is "vector" (embedding distance), "keyword" (BM25 over character
+        bigrams, which catches exact vocabulary such as 誕生日) or "hybrid",
+        which merges the two rankings with reciprocal rank fusion. where
+        restricts results to questions whose metadata matches, e.g.
+        {"video_id": "sY7L5cfCWno"}.
+        """
         if section_num not in [2, 3]:
             raise ValueError("Only sections 2 and 3 are currently supported")
+        if mode not in ["vector", "keyword", "hybrid"]:
+            raise ValueError(f"Unknown search mode: {mode}")
+            
+        if where and any(isinstance(value, (list, tuple, set)) and not value for value in where.values()):
+            # An empty list of allowed values matches nothing
+            return [[] for _ in queries]
             
         collection = self.collections[f"section{section_num}"]
+        # Each ranking contributes more candidates than needed, so fusion can reorder them
+        depth = n_results if mode == "vector" else max(20, 4 * n_results)
         
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
+        vector_hits = [[] for _ in queries]
+        if mode != "keyword":
+            if self.index_backend == "numpy":
+                results = collection.query(query_texts=queries, n_results=depth, where=where)
+            else:
+                chroma_where = self._chroma_where(where)
+                results = collection.query(
+                    query_texts=queries,
+                    n_results=depth,
+                    **({"where": chroma_where} if chroma_where else {})
+                )
+            vector_hits = [
+                list(zip(ids, metadatas, distances))
+                for ids, metadatas, distances in zip(results['ids'], results['metadatas'], results['distances'])
+            ]
+        
+        keyword_hits = [[] for _ in queries]
+        if mode != "vector":
+            index = self.keyword_index(section_num)
+            keyword_hits = [
+                [(id, index.metadatas[index.numbers[id]], score) for id, score in index.search(query, depth, where)]
+                for query in queries
+            ]
         
         # Convert results to more usable format
-        questions = []
-        for idx, metadata in enumerate(results['metadatas'][0]):
-            question_data = json.loads(metadata['full_structure'])
-            question_data['similarity_score'] = results['distances'][0][idx]
-            questions.append(question_data)
+        batches = []
+        for vector_ranking, keyword_ranking in zip(vector_hits, keyword_hits):
+            fused = {}
+            for ranking in [vector_ranking, keyword_ranking]:
+                for rank, (id, metadata, _) in enumerate(ranking):
+                    # Reciprocal rank fusion, with the customary k = 60
+                    fused.setdefault(id, [metadata, 0.0])[1] += 1.0 / (60 + rank + 1)
+            distances = {id: distance for id, _, distance in vector_ranking}
             
-        return questions
+            questions = []
+            for id in sorted(fused, key=lambda id: -fused[id][1])[:n_results]:
+                metadata, score = fused[id]
+                question_data = json.loads(metadata['full_structure'])
+                # Distance from the vector search; None for keyword-only matches
+                question_data['similarity_score'] = distances.get(id)
+                question_data['retrieval_score'] = score
+                questions.append(question_data)
+            batches.append(questions)
+            
+        return batches
 
     def get_question_by_id(self, section_num: int, question_id: str) -> Optional[Dict]:
         """Retrieve a specific question by its ID"""
@@ -193,32 +493,105 @@ class QuestionVectorStore:
             print(f"Error parsing questions from {filename}: {str(e)}")
             return []
 
-    def index_questions_file(self, filename: str, section_num: int):
-        """Index all questions from a file into the vector store"""
+    def index_questions_file(self, filename: str, section_num: int) -> Optional[Dict[str, int]]:
+        """Index all questions from a file into the vector store, None if the file had none"""
         # Extract video ID from filename
         video_id = os.path.basename(filename).split('_section')[0]
         
         # Parse questions from file
         questions = self.parse_questions_from_file(filename)
         
-        # Add to vector store
-        if questions:
-            self.add_questions(section_num, questions, video_id)
-            print(f"Indexed {len(questions)} questions from {filename}")
+        # Add to vector store. A file that yields no questions (or can't be
+        # read) leaves the existing entries alone.
+        if not questions:
+            return None
+        counts = self.add_questions(section_num, questions, video_id)
+        print(
+            f"Indexed {len(questions)} questions from {filename} "
+            f"({counts['added']} added, {counts['unchanged']} unchanged, {counts['deleted']} removed)"
+        )
+        return counts
+
+    def manifest_path(self) -> str:
+        return os.path.join(
+            self.persist_directory, f"index_manifest_{self.index_backend}_{self.embedding_backend}.json"
+        )
+
+    def index_directory(self, directory: str = "backend/data/questions") -> Dict[str, int]:
+        """
+        Index every `<video_id>_section<N>.txt` file in a directory.
+
+        A manifest of each file's mtime, size and hash is kept next to the
+        index so files that haven't changed since the last run aren't even
+        read. Questions of files that disappeared are removed.
+        """
+        manifest_path = self.manifest_path()
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        
+        summary = {"files_indexed": 0, "files_skipped": 0, "files_removed": 0, "files_failed": 0}
+        current = {}
+        for filename in sorted(glob.glob(os.path.join(directory, "*_section*.txt"))):
+            match = re.search(r'_section(\d+)\.txt$', filename)
+            if not match or int(match.group(1)) not in [2, 3]:
+                continue
+            section_num = int(match.group(1))
+            key = os.path.basename(filename)
+            stat = os.stat(filename)
+            entry = manifest.get(key)
+            
+            if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                current[key] = entry
+                summary["files_skipped"] += 1
+                continue
+            
+            with open(filename, 'rb') as f:
+                file_hash = hashlib.sha256(f.read()).hexdigest()
+            if not entry or entry["sha256"] != file_hash:
+                try:
+                    counts = self.index_questions_file(filename, section_num)
+                except Exception as e:
+                    print(f"Error indexing {filename}: {str(e)}")
+                    counts = None
+                if counts is None:
+                    # Not recorded, so the next run tries again; a previous
+                    # entry is kept so the file's questions aren't removed
+                    if entry:
+                        current[key] = entry
+                    summary["files_failed"] += 1
+                    continue
+                summary["files_indexed"] += 1
+            else:
+                # Touched but not changed
+                summary["files_skipped"] += 1
+            current[key] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": file_hash, "section": section_num}
+        
+        # Files that are gone take their questions with them
+        for key in set(manifest) - set(current):
+            video_id = key.split('_section')[0]
+            self.collections[f"section{manifest[key]['section']}"].delete(where={"video_id": video_id})
+            summary["files_removed"] += 1
+            print(f"Removed questions of deleted file {key}")
+        
+        os.makedirs(self.persist_directory, exist_ok=True)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        return summary
 
 if __name__ == "__main__":
     # Example usage
-    store = QuestionVectorStore()
-    
-    # Index questions from files
-    question_files = [
-        ("backend/data/questions/sY7L5cfCWno_section2.txt", 2),
-        ("backend/data/questions/sY7L5cfCWno_section3.txt", 3)
-    ]
+    store = QuestionVectorStore(
+        embedding_backend=os.environ.get("EMBEDDING_BACKEND", "bedrock"),
+        index_backend=os.environ.get("INDEX_BACKEND", "chroma")
+    )
     
-    for filename, section_num in question_files:
-        if os.path.exists(filename):
-            store.index_questions_file(filename, section_num)
+    # Index new and changed question files
+    print(store.index_directory("backend/data/questions"))
     
     # Search for similar questions
     similar = store.search_similar_questions(2, "誕生日について質問", n_results=1)
+
+    if store.embedding_backend == "bedrock":
+        print("Embedding cache:", store.embedding_fn.cache.stats())
@@ -1,12 +1,13 @@
 import streamlit as st
 import sys
 import os
-import json
-from datetime import datetime
+import uuid
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.question_generator import QuestionGenerator
 from backend.audio_generator import AudioGenerator
+from backend.question_pool import QuestionPool, SECTION_NUMS
+from backend.question_store import QuestionStore
 
 # Page config
 st.set_page_config(
@@ -15,48 +16,62 @@ st.set_page_config(
     layout="wide"
 )
 
-def load_stored_questions():
-    """Load previously stored questions from JSON file"""
-    questions_file = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-        "backend/data/stored_questions.json"
+# Topics offered for each practice type
+TOPICS = {
+    "Dialogue Practice": ["Daily Conversation", "Shopping", "Restaurant", "Travel", "School/Work"],
+    "Phrase Matching": ["Announcements", "Instructions", "Weather Reports", "News Updates"]
+}
+
+@st.cache_resource
+def get_question_pool():
+    """Pre-generated questions shared by every session; QUESTION_POOL_DEPTH=0 turns it off"""
+    pool = QuestionPool(
+        QuestionGenerator(),
+        AudioGenerator(),
+        keys=[(practice_type, topic) for practice_type, topics in TOPICS.items() for topic in topics],
+        depth=int(os.environ.get("QUESTION_POOL_DEPTH", "2"))
     )
-    if os.path.exists(questions_file):
-        with open(questions_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    pool.start()
+    return pool
+
+# Saved questions listed per page in the sidebar
+QUESTIONS_PER_PAGE = 10
+
+@st.cache_resource
+def get_question_store():
+    """Saved questions, imported from stored_questions.json on first use"""
+    return QuestionStore()
 
 def save_question(question, practice_type, topic, audio_file=None):
-    """Save a generated question to JSON file"""
-    questions_file = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-        "backend/data/stored_questions.json"
-    )
-    
-    # Load existing questions
-    stored_questions = load_stored_questions()
-    
-    # Create a unique ID for the question using timestamp
-    question_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Add metadata
-    question_data = {
-        "question": question,
-        "practice_type": practice_type,
-        "topic": topic,
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "audio_file": audio_file
-    }
+    """Save a generated question and return its id"""
+    return get_question_store().add(question, practice_type, topic, audio_file)
+
+def render_question_stream(stream, practice_type):
+    """Show each field of a question as it is generated, returning the finished question"""
+    if practice_type == "Dialogue Practice":
+        fields = ["Introduction", "Conversation", "Question", "Options"]
+    else:
+        fields = ["Situation", "Question", "Options"]
     
-    # Add to stored questions
-    stored_questions[question_id] = question_data
+    with st.container():
+        st.subheader("Practice Scenario")
+        status = st.empty()
+        status.caption("Generating question...")
+        placeholders = {field: st.empty() for field in fields}
     
-    # Save back to file
-    os.makedirs(os.path.dirname(questions_file), exist_ok=True)
-    with open(questions_file, 'w', encoding='utf-8') as f:
-        json.dump(stored_questions, f, ensure_ascii=False, indent=2)
+    question = None
+    for field, value in stream:
+        if field == "done":
+            question = value
+        elif field == "Options":
+            placeholders[field].markdown(
+                "**Options:**\n\n" + "\n".join(f"{i}. {option}" for i, option in enumerate(value, 1))
+            )
+        elif field in placeholders:
+            placeholders[field].markdown(f"**{field}:**\n\n{value}")
     
-    return question_id
+    status.empty()
+    return question
 
 def render_interactive_stage():
     """Render the interactive learning stage"""
@@ -75,24 +90,58 @@ def render_interactive_stage():
         st.session_state.current_topic = None
     if 'current_audio' not in st.session_state:
         st.session_state.current_audio = None
+    if 'generation_timing' not in st.session_state:
+        st.session_state.generation_timing = None
+    if 'from_pool' not in st.session_state:
+        st.session_state.from_pool = False
+    if 'current_question_id' not in st.session_state:
+        st.session_state.current_question_id = None
+    if 'sidebar_page' not in st.session_state:
+        st.session_state.sidebar_page = 0
+    if 'learner_id' not in st.session_state:
+        # Cached questions are only served to learners who haven't seen them
+        st.session_state.learner_id = uuid.uuid4().hex
         
-    # Load stored questions for sidebar
-    stored_questions = load_stored_questions()
+    # Load one page of stored questions for the sidebar
+    question_store = get_question_store()
+    total_questions = question_store.count()
+    pages = max(1, -(-total_questions // QUESTIONS_PER_PAGE))
+    st.session_state.sidebar_page = min(st.session_state.sidebar_page, pages - 1)
+    stored_questions = question_store.list(
+        limit=QUESTIONS_PER_PAGE,
+        offset=st.session_state.sidebar_page * QUESTIONS_PER_PAGE
+    )
     
     # Create sidebar
     with st.sidebar:
         st.header("Saved Questions")
         if stored_questions:
-            for qid, qdata in stored_questions.items():
+            for qdata in stored_questions:
                 # Create a button for each question
                 button_label = f"{qdata['practice_type']} - {qdata['topic']}\n{qdata['created_at']}"
-                if st.button(button_label, key=qid):
+                if st.button(button_label, key=qdata['id']):
                     st.session_state.current_question = qdata['question']
+                    st.session_state.current_question_id = qdata['id']
                     st.session_state.current_practice_type = qdata['practice_type']
                     st.session_state.current_topic = qdata['topic']
                     st.session_state.current_audio = qdata.get('audio_file')
                     st.session_state.feedback = None
+                    st.session_state.generation_timing = None
+                    st.session_state.from_pool = False
                     st.rerun()
+            
+            if pages > 1:
+                prev_col, page_col, next_col = st.columns([1, 2, 1])
+                with prev_col:
+                    if st.button("◀", disabled=st.session_state.sidebar_page == 0):
+                        st.session_state.sidebar_page -= 1
+                        st.rerun()
+                with page_col:
+                    st.caption(f"Page {st.session_state.sidebar_page + 1} of {pages}")
+                with next_col:
+                    if st.button("▶", disabled=st.session_state.sidebar_page >= pages - 1):
+                        st.session_state.sidebar_page += 1
+                        st.rerun()
         else:
             st.info("No saved questions yet. Generate some questions to see them here!")
     
@@ -103,33 +152,66 @@ def render_interactive_stage():
     )
     
     # Topic selection
-    topics = {
-        "Dialogue Practice": ["Daily Conversation", "Shopping", "Restaurant", "Travel", "School/Work"],
-        "Phrase Matching": ["Announcements", "Instructions", "Weather Reports", "News Updates"]
-    }
-    
     topic = st.selectbox(
         "Select Topic",
-        topics[practice_type]
+        TOPICS[practice_type]
     )
     
     # Generate new question button
+    question_pool = get_question_pool()
     if st.button("Generate New Question"):
-        section_num = 2 if practice_type == "Dialogue Practice" else 3
-        new_question = st.session_state.question_generator.generate_similar_question(
-            section_num, topic
-        )
-        st.session_state.current_question = new_question
-        st.session_state.current_practice_type = practice_type
-        st.session_state.current_topic = topic
-        st.session_state.feedback = None
+        # Serve a pre-generated question if one is ready
+        bundle = question_pool.pop(practice_type, topic)
+        if bundle:
+            st.session_state.current_question = bundle['question']
+            st.session_state.current_practice_type = practice_type
+            st.session_state.current_topic = topic
+            st.session_state.current_audio = bundle['audio_file']
+            st.session_state.feedback = None
+            st.session_state.generation_timing = None
+            st.session_state.from_pool = True
+            question_cache = st.session_state.question_generator.question_cache
+            if question_cache:
+                question_cache.mark_seen(st.session_state.learner_id, bundle['question'])
+            st.session_state.current_question_id = save_question(
+                bundle['question'], practice_type, topic, bundle['audio_file']
+            )
+            st.rerun()
         
-        # Save the generated question
-        save_question(new_question, practice_type, topic)
-        st.session_state.current_audio = None
+        # Otherwise generate one now
+        section_num = SECTION_NUMS[practice_type]
+        new_question = render_question_stream(
+            st.session_state.question_generator.generate_similar_question_stream(
+                section_num, topic, learner_id=st.session_state.learner_id
+            ),
+            practice_type
+        )
+        if new_question:
+            st.session_state.current_question = new_question
+            st.session_state.current_practice_type = practice_type
+            st.session_state.current_topic = topic
+            st.session_state.feedback = None
+            
+            # Save the generated question
+            st.session_state.current_question_id = save_question(new_question, practice_type, topic)
+            st.session_state.current_audio = None
+            st.session_state.generation_timing = st.session_state.question_generator.last_stream_timing
+            st.session_state.from_pool = False
+            st.rerun()
+        else:
+            st.error("Could not generate a question, please try again.")
     
     if st.session_state.current_question:
         st.subheader("Practice Scenario")
+        timing = st.session_state.generation_timing
+        if timing and timing.get("cached"):
+            st.caption(f"Served from the question cache in {timing['total']:.2f}s")
+        elif timing and timing["time_to_first_field"] is not None:
+            st.caption(
+                f"Generated in {timing['total']:.1f}s, first field shown after {timing['time_to_first_field']:.1f}s"
+            )
+        elif st.session_state.from_pool:
+            st.caption("Served from the pre-generated questions")
         
         # Display question components
         if practice_type == "Dialogue Practice":
@@ -153,7 +235,7 @@ def render_interactive_stage():
             # If we have feedback, show which answers were correct/incorrect
             if st.session_state.feedback:
                 correct = st.session_state.feedback.get('correct', False)
-                correct_answer = st.session_state.feedback.get('correct_answer', 1) - 1
+                correct_answer = st.session_state.feedback['correct_answer'] - 1
                 selected_index = st.session_state.selected_answer - 1 if hasattr(st.session_state, 'selected_answer') else -1
                 
                 st.write("\n**Your Answer:**")
@@ -192,11 +274,15 @@ def render_interactive_stage():
                 if selected and st.button("Submit Answer"):
                     selected_index = options.index(selected) + 1
                     st.session_state.selected_answer = selected_index
-                    st.session_state.feedback = st.session_state.question_generator.get_feedback(
+                    feedback = st.session_state.question_generator.get_feedback(
                         st.session_state.current_question,
                         selected_index
                     )
-                    st.rerun()
+                    if feedback:
+                        st.session_state.feedback = feedback
+                        st.rerun()
+                    else:
+                        st.error("Could not check this answer, please try again.")
         
         with col2:
             st.subheader("Audio")
@@ -228,12 +314,15 @@ def render_interactive_stage():
                             st.session_state.current_audio = audio_file
                             
                             # Update stored question with audio file
-                            save_question(
-                                st.session_state.current_question,
-                                st.session_state.current_practice_type,
-                                st.session_state.current_topic,
-                                audio_file
-                            )
+                            if st.session_state.current_question_id:
+                                get_question_store().set_audio(st.session_state.current_question_id, audio_file)
+                            else:
+                                st.session_state.current_question_id = save_question(
+                                    st.session_state.current_question,
+                                    st.session_state.current_practice_type,
+                                    st.session_state.current_topic,
+                                    audio_file
+                                )
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error generating audio: {str(e)}")